@@ -0,0 +1,259 @@
+"""
+Метрики в текстовом формате Prometheus без внешних зависимостей.
+
+Каждый процесс gunicorn накапливает гистограммы и счетчики в памяти и не
+чаще раза в METRICS_FLUSH_INTERVAL секунд атомарно записывает их в свой
+файл в каталоге METRICS_DIR. Запрос к /metrics суммирует файлы всех
+процессов, поэтому данные воркера, не обслужившего запросов после
+последней записи, могут отставать на этот интервал. Новый процесс
+переносит файлы завершившихся процессов (например, после --max-requests)
+в общий накопительный файл, поэтому счетчики не уменьшаются, а число
+файлов не растет. Перенос и чтение разделяет блокировка файла.
+"""
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from bisect import bisect_left
+from collections import defaultdict
+from glob import glob
+from time import monotonic
+from uuid import uuid4
+
+from django.conf import settings
+from django.http import HttpResponse
+
+REQUEST_DURATION = 'foodgram_request_duration_seconds'
+REQUEST_QUERIES = 'foodgram_request_queries'
+RESPONSE_SIZE = 'foodgram_response_size_bytes'
+CACHE_REQUESTS = 'foodgram_cache_requests_total'
+
+HISTOGRAMS = {
+    REQUEST_DURATION: (
+        'Время обработки запроса',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    ),
+    REQUEST_QUERIES: (
+        'Количество SQL-запросов на запрос',
+        (0, 1, 2, 5, 10, 20, 50, 100)
+    ),
+    RESPONSE_SIZE: (
+        'Размер тела ответа',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+    ),
+}
+COUNTERS = {
+    CACHE_REQUESTS: 'Обращения к кэшам приложения (result: hit или miss)',
+}
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+ARCHIVE_FILE = 'archive.json'
+LOCK_FILE = '.lock'
+
+
+class MetricsRegistry:
+    """Метрики текущего процесса и их сохранение в общий каталог."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pid = None
+
+    def reset(self):
+        """Начинает новый файл, в том числе в дочернем процессе после fork."""
+
+        self.pid = os.getpid()
+        self.path = os.path.join(
+            settings.METRICS_DIR, f'{self.pid}-{uuid4().hex}.json'
+        )
+        self.counters = defaultdict(float)
+        self.histograms = {}
+        self.flushed = monotonic()
+        archive_dead_processes()
+
+    def check_process(self):
+        if self.pid != os.getpid():
+            self.reset()
+
+    def observe(self, name, value, **labels):
+        buckets = HISTOGRAMS[name][1]
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.check_process()
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                # Счетчики корзин, включая +Inf, затем сумма и количество.
+                histogram = self.histograms[key] = [0] * (len(buckets) + 3)
+            histogram[bisect_left(buckets, value)] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def inc(self, name, value=1, **labels):
+        with self.lock:
+            self.check_process()
+            self.counters[(name, tuple(sorted(labels.items())))] += value
+
+    def flush(self, force=False):
+        with self.lock:
+            self.check_process()
+            now = monotonic()
+            if (
+                not force
+                and now - self.flushed < settings.METRICS_FLUSH_INTERVAL
+            ):
+                return
+            self.flushed = now
+            os.makedirs(settings.METRICS_DIR, exist_ok=True)
+            write_metrics(self.path, self.counters, self.histograms)
+
+
+registry = MetricsRegistry()
+
+
+def write_metrics(path, counters, histograms):
+    temp_path = f'{path}.tmp'
+    with open(temp_path, 'w') as file:
+        json.dump({
+            'counters': [
+                [name, labels, value]
+                for (name, labels), value in counters.items()
+            ],
+            'histograms': [
+                [name, labels, values]
+                for (name, labels), values in histograms.items()
+            ]
+        }, file)
+    os.replace(temp_path, path)
+
+
+@contextmanager
+def metrics_lock(operation):
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    with open(os.path.join(settings.METRICS_DIR, LOCK_FILE), 'w') as file:
+        fcntl.flock(file, operation)
+        yield
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def get_dead_paths(paths):
+    """Файлы процессов вида «pid-uuid.json», которые уже завершились."""
+
+    dead = []
+    for path in paths:
+        pid, _, _ = os.path.basename(path).partition('-')
+        if pid.isdigit() and not is_alive(int(pid)):
+            dead.append(path)
+    return dead
+
+
+def archive_dead_processes():
+    """
+    Суммирует метрики завершившихся процессов в накопительный файл и
+    удаляет их файлы.
+    """
+
+    archive_path = os.path.join(settings.METRICS_DIR, ARCHIVE_FILE)
+    with metrics_lock(fcntl.LOCK_EX):
+        dead = get_dead_paths(
+            glob(os.path.join(settings.METRICS_DIR, '*.json'))
+        )
+        if not dead:
+            return
+        write_metrics(archive_path, *read_metrics([archive_path, *dead]))
+        for path in dead:
+            os.remove(path)
+
+
+def record_cache(cache, hit):
+    """Учитывает обращение к кэшу, если метрики включены."""
+
+    if settings.METRICS:
+        registry.inc(
+            CACHE_REQUESTS, cache=cache, result='hit' if hit else 'miss'
+        )
+
+
+def read_metrics(paths):
+    counters = defaultdict(float)
+    histograms = {}
+    for path in paths:
+        try:
+            with open(path) as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            continue
+        for name, labels, value in data['counters']:
+            counters[(name, tuple(map(tuple, labels)))] += value
+        for name, labels, values in data['histograms']:
+            key = (name, tuple(map(tuple, labels)))
+            if key in histograms:
+                histograms[key] = [
+                    total + value
+                    for total, value in zip(histograms[key], values)
+                ]
+            else:
+                histograms[key] = values
+    return counters, histograms
+
+
+def collect():
+    """Суммирует метрики всех процессов из общего каталога."""
+
+    with metrics_lock(fcntl.LOCK_SH):
+        return read_metrics(
+            glob(os.path.join(settings.METRICS_DIR, '*.json'))
+        )
+
+
+def format_labels(labels):
+    return '{' + ','.join(
+        '{}="{}"'.format(
+            name,
+            str(value).replace('\\', r'\\').replace('"', r'\"').replace(
+                '\n', r'\n'
+            )
+        )
+        for name, value in labels
+    ) + '}'
+
+
+def render_metrics():
+    counters, histograms = collect()
+    lines = []
+    for name, (description, buckets) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} histogram']
+        for (metric, labels), values in sorted(histograms.items()):
+            if metric != name:
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + ('+Inf',), values):
+                cumulative += count
+                lines.append(
+                    f'{name}_bucket'
+                    f'{format_labels(labels + (("le", bound),))} {cumulative}'
+                )
+            lines.append(f'{name}_sum{format_labels(labels)} {values[-2]}')
+            lines.append(f'{name}_count{format_labels(labels)} {values[-1]}')
+    for name, description in COUNTERS.items():
+        lines += [f'# HELP {name} {description}', f'# TYPE {name} counter']
+        lines.extend(
+            f'{name}{format_labels(labels)} {value}'
+            for (metric, labels), value in sorted(counters.items())
+            if metric == name
+        )
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """Отдает метрики всех процессов в текстовом формате Prometheus."""
+
+    registry.flush(force=True)
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
@@ -0,0 +1,172 @@
+import logging
+from collections import Counter
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Обертка выполнения SQL: считает запросы и суммарное время."""
+
+    def __init__(self):
+        self.queries = []
+        self.time = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.time += perf_counter() - started
+            self.queries.append(sql)
+
+    def get_duplicates(self, count):
+        return [
+            (sql, repeats)
+            for sql, repeats in Counter(self.queries).most_common(count)
+            if repeats > 1
+        ]
+
+
+class ServerTimingMiddleware:
+    """
+    Замеряет время обработки запроса по этапам (SQL, вьюха, сериализация
+    внутри вьюхи, кодирование ответа в JSON), добавляет заголовок
+    Server-Timing и пишет в лог медленные запросы с самыми частыми
+    повторяющимися SQL-запросами. Время сериализации записывают вьюсеты с
+    SerializationTimingMixin. Включается настройкой SERVER_TIMING, иначе не
+    подключается вовсе.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = perf_counter()
+        request._timing = {}
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        finished = perf_counter()
+
+        timing = request._timing
+        view_started = timing.get('view_started', started)
+        view_finished = timing.get('view_finished', finished)
+        durations = {
+            'db': stats.time,
+            'view': view_finished - view_started,
+            'serialize': timing.get('serialize', 0),
+            'render': finished - view_finished,
+            'total': finished - started
+        }
+        response['Server-Timing'] = ', '.join(
+            f'{name};dur={duration * 1000:.1f}'
+            + (f';desc="{len(stats.queries)} queries"' if name == 'db' else '')
+            for name, duration in durations.items()
+        )
+        if durations['total'] * 1000 >= settings.SLOW_REQUEST_THRESHOLD:
+            self.log_slow_request(request, response, durations, stats)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing['view_started'] = perf_counter()
+
+    def process_template_response(self, request, response):
+        request._timing['view_finished'] = perf_counter()
+        return response
+
+    @staticmethod
+    def log_slow_request(request, response, durations, stats):
+        duplicates = ''.join(
+            f'\n  {repeats} x {sql}'
+            for sql, repeats in stats.get_duplicates(
+                settings.SLOW_REQUEST_DUPLICATES
+            )
+        )
+        logger.warning(
+            'Медленный запрос %s %s (%s): %.1f мс, SQL: %d запросов за '
+            '%.1f мс, сериализация %.1f мс, рендеринг %.1f мс%s',
+            request.method, request.get_full_path(), response.status_code,
+            durations['total'] * 1000, len(stats.queries),
+            durations['db'] * 1000, durations['serialize'] * 1000,
+            durations['render'] * 1000, duplicates
+        )
+
+
+def get_view_name(request):
+    """
+    Имя обработчика для меток метрик: «Вьюсет.действие» для вьюсетов DRF,
+    «Класс.метод» для остальных классов и имя маршрута для функций.
+    """
+
+    match = request.resolver_match
+    if match is None:
+        return 'unresolved'
+    view_class = getattr(match.func, 'cls', None)
+    if view_class is None:
+        return match.view_name
+    method = request.method.lower()
+    action = (getattr(match.func, 'actions', None) or {}).get(method, method)
+    return f'{view_class.__name__}.{action}'
+
+
+class MetricsMiddleware:
+    """
+    Собирает гистограммы времени ответа, количества SQL-запросов и размера
+    ответа по обработчикам и методам для /metrics. Включается настройкой
+    METRICS.
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        started = perf_counter()
+        stats = QueryStats()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        if request.resolver_match and (
+            request.resolver_match.func is metrics.metrics_view
+        ):
+            return response
+
+        labels = {'view': get_view_name(request), 'method': request.method}
+        metrics.registry.observe(
+            metrics.REQUEST_DURATION, perf_counter() - started, **labels
+        )
+        metrics.registry.observe(
+            metrics.REQUEST_QUERIES, len(stats.queries), **labels
+        )
+        if response.streaming:
+            response.streaming_content = self.measure_stream(
+                response.streaming_content, labels
+            )
+        else:
+            metrics.registry.observe(
+                metrics.RESPONSE_SIZE, len(response.content), **labels
+            )
+            metrics.registry.flush()
+        return response
+
+    @staticmethod
+    def measure_stream(content, labels):
+        """Учитывает размер потокового ответа после его отправки."""
+
+        size = 0
+        try:
+            for chunk in content:
+                size += len(chunk)
+                yield chunk
+        finally:
+            metrics.registry.observe(metrics.RESPONSE_SIZE, size, **labels)
+            metrics.registry.flush()
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -40,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram_backend.middleware.MetricsMiddleware',
+    'foodgram_backend.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -50,6 +53,10 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Заголовок Server-Timing и лог медленных запросов (время в миллисекундах).
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'False') == 'True'
+SLOW_REQUEST_THRESHOLD = int(os.getenv('SLOW_REQUEST_THRESHOLD', 500))
+SLOW_REQUEST_DUPLICATES = 5
 
 ROOT_URLCONF = 'foodgram_backend.urls'
 
@@ -100,14 +107,44 @@ REST_FRAMEWORK = {
 DJOSER = {
     'LOGIN_FIELD': 'email',
     'SERIALIZERS': {'user': 'users.serializers.UserSerializer', },
-    'HIDE_USERS': False
+    'HIDE_USERS': False,
+    'PASSWORD_RESET_CONFIRM_URL': 'reset_password/{uid}/{token}',
+    'USERNAME_RESET_CONFIRM_URL': 'reset_email/{uid}/{token}'
 
 }
 
 
+# В docker-compose брокером служит RabbitMQ, задачи выполняет сервис worker.
+# Без брокера (локальный запуск) задачи выполняются синхронно в процессе
+# веб-сервера.
+CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL')
+CELERY_TASK_ALWAYS_EAGER = not CELERY_BROKER_URL
+CELERY_TASK_IGNORE_RESULT = True
+
+SHARED_CACHE_DIR = os.getenv(
+    'SHARED_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'foodgram')
+)
+
+# Метрики Prometheus по адресу /metrics. Воркеры пишут метрики в файлы в
+# общем каталоге, при запросе они суммируются.
+METRICS = os.getenv('METRICS', 'False') == 'True'
+METRICS_DIR = os.getenv(
+    'METRICS_DIR', os.path.join(SHARED_CACHE_DIR, 'metrics')
+)
+METRICS_FLUSH_INTERVAL = 1
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = '/media'
 
+STORAGES = {
+    'default': {
+        'BACKEND': 'recipes.storage.ContentAddressedStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
 
 AUTH_USER_MODEL = 'users.User'
 
@@ -1,8 +1,10 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
+from django.db.models import Prefetch
 from django.utils.safestring import mark_safe
 from import_export.admin import ImportExportModelAdmin
 
+from .admin_filters import input_filter
 from .models import (Favorites, Ingredient, Recipe, RecipeIngredient,
                      RecipeTag, ShoppingCart, Tag)
 from .resource import IngredientResource
@@ -10,11 +12,17 @@ from .resource import IngredientResource
 admin.site.unregister(Group)
 
 
+RECIPE_FILTER = input_filter('recipe__name', 'рецепту')
+USER_FILTER = input_filter('user__username', 'пользователю')
+
+
 @admin.register(Favorites)
 class FavoritesAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'user')
-    list_filter = ('recipe', 'user')
-    search_fields = ('recipe',)
+    list_filter = (RECIPE_FILTER, USER_FILTER)
+    list_select_related = ('recipe', 'user')
+    search_fields = ('recipe__name', 'user__username')
+    autocomplete_fields = ('recipe', 'user')
     empty_value_display = 'пусто'
 
 
@@ -22,18 +30,21 @@ class FavoritesAdmin(admin.ModelAdmin):
 class IngredientAdmin(ImportExportModelAdmin):
     resource_class = IngredientResource
     list_display = ('name', 'measurement_unit')
-    list_filter = ('name', 'measurement_unit')
+    list_filter = ('measurement_unit',)
+    ordering = ('name',)
     search_fields = ('name',)
     empty_value_display = 'пусто'
 
 
 class IngredientsInline(admin.TabularInline):
     model = RecipeIngredient
+    autocomplete_fields = ('ingredient',)
     min_num = 1
 
 
 class TagsInLine(admin.TabularInline):
     model = RecipeTag
+    autocomplete_fields = ('tag',)
     min_num = 1
 
 
@@ -44,17 +55,23 @@ class RecipetAdmin(admin.ModelAdmin):
         'favorites_count', 'image_display', 'text',
     )
     list_display_links = ('author', 'name', 'get_ingredients', 'pub_date')
-    list_filter = ('author', 'name', 'pub_date')
+    list_filter = (input_filter('author__username', 'автору'), 'pub_date')
+    list_select_related = ('author',)
     search_fields = ('name',)
+    autocomplete_fields = ('author',)
     empty_value_display = 'пусто'
     inlines = [
         IngredientsInline,
         TagsInLine
     ]
 
-    @admin.display(description='Добавлено в избранное')
-    def favorites_count(self, obj):
-        return obj.favorites.count()
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch(
+                'ingredients_used',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
 
     @admin.display(description='Ингредиенты')
     def get_ingredients(self, obj):
@@ -71,24 +88,32 @@ class RecipetAdmin(admin.ModelAdmin):
 @admin.register(RecipeIngredient)
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ('amount', 'ingredient', 'recipe')
-    list_filter = ('ingredient', 'recipe')
-    search_fields = ('ingredient', 'recipe')
+    list_filter = (
+        input_filter('ingredient__name', 'ингредиенту'), RECIPE_FILTER
+    )
+    list_select_related = ('ingredient', 'recipe')
+    search_fields = ('ingredient__name', 'recipe__name')
+    autocomplete_fields = ('ingredient', 'recipe')
     empty_value_display = 'пусто'
 
 
 @admin.register(RecipeTag)
 class RecipeTagAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'tag')
-    list_filter = ('recipe', 'tag')
-    search_fields = ('recipe', 'tag')
+    list_filter = (RECIPE_FILTER, 'tag')
+    list_select_related = ('recipe', 'tag')
+    search_fields = ('recipe__name', 'tag__name')
+    autocomplete_fields = ('recipe', 'tag')
     empty_value_display = 'пусто'
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
     list_display = ('recipe', 'user')
-    list_filter = ('recipe', 'user')
-    search_fields = ('recipe',)
+    list_filter = (RECIPE_FILTER, USER_FILTER)
+    list_select_related = ('recipe', 'user')
+    search_fields = ('recipe__name', 'user__username')
+    autocomplete_fields = ('recipe', 'user')
     empty_value_display = 'пусто'
 
 
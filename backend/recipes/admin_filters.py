@@ -0,0 +1,46 @@
+from django.contrib import admin
+from django.contrib.admin.views.main import PAGE_VAR
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Фильтр админки с текстовым полем вместо списка вариантов: не загружает
+    все связанные объекты, поэтому подходит для фильтрации по внешним
+    ключам с большим количеством значений.
+    """
+
+    lookup = 'icontains'
+    template = 'admin/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        return ((None, None),)
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(
+                **{f'{self.parameter_name}__{self.lookup}': self.value()}
+            )
+        return queryset
+
+    def choices(self, changelist):
+        query_parts = {
+            name: value for name, value in changelist.params.items()
+            if name not in (self.parameter_name, PAGE_VAR)
+        }
+        yield {
+            'selected': self.value() is None,
+            'query_string': changelist.get_query_string(
+                remove=[self.parameter_name]
+            ),
+            'query_parts': query_parts.items(),
+        }
+
+
+def input_filter(field, title, lookup=InputFilter.lookup):
+    """Создает текстовый фильтр по полю field (можно через __)."""
+
+    return type(
+        f'{field.title().replace("_", "")}InputFilter',
+        (InputFilter,),
+        {'lookup': lookup, 'parameter_name': field, 'title': title}
+    )
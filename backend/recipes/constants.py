@@ -3,3 +3,27 @@ PAGE_SIZE = 6
 POSITIVE_SMALL_MAX = 32767
 NAME_SLUG_MEASURE_MAX_LENGTH = 200
 TIME_MIN_VALUE = 1
+CURSOR_COUNT_CACHE_TIMEOUT = 60
+SHOPPING_LIST_CHUNK_SIZE = 2000
+SHOPPING_CART_BATCH_SIZE = 500
+SEARCH_CONFIG = 'russian'
+SEARCH_TERM_MAX_LENGTH = 64
+SEARCH_INDEX_BATCH_SIZE = 500
+BULK_RECIPES_MAX_LENGTH = 100
+COUNTERS_BATCH_SIZE = 1000
+IMAGE_RENDITIONS = {
+    'card': (600, 400),
+    'detail': (1200, 800),
+    'thumb': (160, 160),
+}
+IMAGE_RENDITIONS_DIR = 'images/renditions'
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+RECIPE_IMAGE_MAX_SIZE = 5 * 1024 * 1024
+RECIPE_IMAGE_MAX_SIDE = 8000
+IMAGES_CLEANUP_GRACE_HOURS = 24
+IMAGES_CLEANUP_SHARDS = 16
+INGREDIENTS_LOAD_BATCH_SIZE = 5000
+GENERATE_DATA_BATCH_SIZE = 2000
+BENCHMARK_REQUESTS = 200
+BENCHMARK_CONCURRENCY = 8
@@ -0,0 +1,38 @@
+import os
+from uuid import uuid4
+
+from django.conf import settings
+
+INGREDIENTS_DATA = 'ingredients'
+TAGS_DATA = 'tags'
+
+
+def get_version_path(name):
+    return os.path.join(settings.SHARED_CACHE_DIR, f'{name}.version')
+
+
+def bump_data_version(name):
+    """
+    Записывает новую версию набора данных. Файл заменяется атомарно, поэтому
+    все процессы, читающие версию, видят либо старое, либо новое значение.
+    """
+
+    os.makedirs(settings.SHARED_CACHE_DIR, exist_ok=True)
+    version = uuid4().hex
+    path = get_version_path(name)
+    temp_path = f'{path}.{os.getpid()}.tmp'
+    with open(temp_path, 'w') as file:
+        file.write(version)
+    os.replace(temp_path, path)
+    return version
+
+
+def get_data_version(name):
+    """Возвращает текущую версию набора данных, общую для всех процессов."""
+
+    try:
+        with open(get_version_path(name)) as file:
+            version = file.read()
+    except FileNotFoundError:
+        version = None
+    return version or bump_data_version(name)
@@ -0,0 +1,58 @@
+from io import BytesIO
+
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+
+from .images import (DETAIL_RENDITION, JPEG_FORMAT, WEBP_FORMAT, accepts_webp,
+                     check_image_limits, get_image_url)
+
+
+class RecipeImageField(serializers.Field):
+    """
+    Ссылка на копию изображения рецепта нужного размера. Размер задается
+    аргументом rendition или ключом image_rendition контекста сериализатора,
+    формат WebP отдается клиентам, которые указали его в заголовке Accept.
+    """
+
+    def __init__(self, rendition=None, **kwargs):
+        self.rendition = rendition
+        kwargs['read_only'] = True
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        request = self.context.get('request')
+        url = get_image_url(
+            recipe,
+            self.rendition or self.context.get(
+                'image_rendition', DETAIL_RENDITION
+            ),
+            WEBP_FORMAT if accepts_webp(request) else JPEG_FORMAT
+        )
+        if request is None:
+            return url
+        return request.build_absolute_uri(url)
+
+
+class RecipeImageUploadField(Base64ImageField):
+    """
+    Изображение рецепта: строка base64 (data URI) из JSON или файл из
+    multipart/form-data. Размер и разрешение проверяются до полного
+    декодирования изображения.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            check_image_limits(data, data.size)
+            # Файл уже загружен, декодировать base64 не нужно.
+            return serializers.ImageField.to_internal_value(self, data)
+        if isinstance(data, str):
+            check_image_limits(None, len(data.split(';base64,')[-1]) * 3 // 4)
+        return super().to_internal_value(data)
+
+    def get_file_extension(self, filename, decoded_file):
+        check_image_limits(BytesIO(decoded_file), len(decoded_file))
+        return super().get_file_extension(filename, decoded_file)
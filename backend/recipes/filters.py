@@ -1,6 +1,15 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
 
-from .models import Ingredient, Recipe
+from .data_versions import TAGS_DATA, get_data_version
+from .models import (Favorites, Ingredient, Recipe, RecipeTag, ShoppingCart,
+                     Tag)
+from .pagination import RecipesCursorPagination
+from .search import search_recipes
+
+_tag_choices = (None, ())
 
 
 class IngredientFilter(filters.FilterSet):
@@ -13,21 +22,90 @@ class IngredientFilter(filters.FilterSet):
         fields = ('name',)
 
 
+def get_tag_choices():
+    """
+    Возвращает варианты слагов тегов. Варианты кэшируются в памяти процесса
+    до изменения версии данных тегов.
+    """
+
+    global _tag_choices
+    version = get_data_version(TAGS_DATA)
+    if _tag_choices[0] != version:
+        _tag_choices = (
+            version,
+            tuple(
+                (slug, slug)
+                for slug in Tag.objects.values_list('slug', flat=True)
+            )
+        )
+    return _tag_choices[1]
+
+
 class RecipeFilter(filters.FilterSet):
     """Фильтр рецептов по автору, тегам, избранныи и списку покупок."""
 
-    tags = filters.AllValuesMultipleFilter(field_name='tags__slug')
+    tags = filters.MultipleChoiceFilter(
+        choices=get_tag_choices,
+        method='filter_tags'
+    )
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
         method='filter_is_in_shopping_cart'
     )
 
+    def filter_tags(self, queryset, name, value):
+        return queryset.filter(
+            Exists(
+                RecipeTag.objects.filter(
+                    recipe=OuterRef('pk'),
+                    tag__slug__in=value
+                )
+            )
+        )
+
+    def filter_user_list(self, queryset, model, value):
+        """Оставляет рецепты, которые есть (или нет) в списке пользователя."""
+
+        user = self.request.user
+        if not user.is_authenticated:
+            return queryset.none() if value else queryset
+        in_list = Exists(
+            model.objects.filter(recipe=OuterRef('pk'), user=user)
+        )
+        return queryset.filter(in_list if value else ~in_list)
+
     def filter_is_favorited(self, queryset, name, value):
-        return queryset.filter(favorites__user=self.request.user.id)
+        return self.filter_user_list(queryset, Favorites, value)
 
     def filter_is_in_shopping_cart(self, queryset, name, value):
-        return queryset.filter(shoppingcart__user=self.request.user.id)
+        return self.filter_user_list(queryset, ShoppingCart, value)
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags__slug', 'is_favorited')
+        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """
+    Полнотекстовый поиск рецептов по названию и описанию с сортировкой по
+    релевантности. Курсорная пагинация сортирует по дате публикации и
+    потеряла бы релевантность, поэтому вместе с поиском не допускается.
+    """
+
+    CURSOR_SEARCH_MESSAGE = (
+        'Поиск не поддерживает курсорную пагинацию, используйте постраничную'
+    )
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        if isinstance(
+            getattr(view, 'paginator', None), RecipesCursorPagination
+        ):
+            raise ValidationError(
+                {self.search_param: self.CURSOR_SEARCH_MESSAGE}
+            )
+        return search_recipes(queryset, query)
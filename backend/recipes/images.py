@@ -0,0 +1,109 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+from rest_framework.exceptions import ValidationError
+
+from .constants import (IMAGE_RENDITIONS, IMAGE_RENDITIONS_DIR, JPEG_QUALITY,
+                        RECIPE_IMAGE_MAX_SIDE, RECIPE_IMAGE_MAX_SIZE,
+                        WEBP_QUALITY)
+
+CARD_RENDITION = 'card'
+DETAIL_RENDITION = 'detail'
+THUMB_RENDITION = 'thumb'
+JPEG_FORMAT = 'jpg'
+WEBP_FORMAT = 'webp'
+
+IMAGE_TOO_LARGE_ERROR = (
+    f'Размер изображения не должен превышать '
+    f'{RECIPE_IMAGE_MAX_SIZE // (1024 * 1024)} МБ'
+)
+IMAGE_RESOLUTION_ERROR = (
+    f'Стороны изображения не должны превышать {RECIPE_IMAGE_MAX_SIDE} пикселей'
+)
+
+SAVE_OPTIONS = {
+    JPEG_FORMAT: (
+        'JPEG',
+        {'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True}
+    ),
+    WEBP_FORMAT: ('WEBP', {'quality': WEBP_QUALITY, 'method': 6}),
+}
+
+
+def check_image_limits(file, size):
+    """
+    Проверяет размер файла и разрешение изображения. Разрешение читается из
+    заголовка файла, пиксели при этом не декодируются.
+    """
+
+    if size > RECIPE_IMAGE_MAX_SIZE:
+        raise ValidationError(IMAGE_TOO_LARGE_ERROR)
+    if file is None:
+        return
+    try:
+        width, height = Image.open(file).size
+    except UnidentifiedImageError:
+        return
+    finally:
+        file.seek(0)
+    if max(width, height) > RECIPE_IMAGE_MAX_SIDE:
+        raise ValidationError(IMAGE_RESOLUTION_ERROR)
+
+
+def encode_image(picture, image_format):
+    """Кодирует изображение PIL в указанный формат и возвращает байты."""
+
+    pil_format, options = SAVE_OPTIONS[image_format]
+    if picture.mode not in ('RGB', 'RGBA') or pil_format == 'JPEG':
+        picture = picture.convert('RGBA' if pil_format == 'WEBP' else 'RGB')
+    buffer = BytesIO()
+    picture.save(buffer, pil_format, **options)
+    return buffer.getvalue()
+
+
+def build_renditions(image):
+    """
+    Создает уменьшенные копии изображения для всех размеров из
+    IMAGE_RENDITIONS в форматах WebP и JPEG. Возвращает словарь путей в
+    хранилище вместе с именем исходного файла.
+    """
+
+    with image.open('rb') as file:
+        source = ImageOps.exif_transpose(Image.open(file))
+        source.load()
+    stem = os.path.splitext(os.path.basename(image.name))[0]
+    renditions = {'source': image.name}
+    for rendition, size in IMAGE_RENDITIONS.items():
+        picture = source.copy()
+        picture.thumbnail(size, Image.LANCZOS)
+        renditions[rendition] = {
+            image_format: image.storage.save(
+                f'{IMAGE_RENDITIONS_DIR}/{stem}-{rendition}.{image_format}',
+                ContentFile(encode_image(picture, image_format))
+            )
+            for image_format in SAVE_OPTIONS
+        }
+    return renditions
+
+
+def accepts_webp(request):
+    return (
+        request is not None
+        and 'image/webp' in request.META.get('HTTP_ACCEPT', '')
+    )
+
+
+def get_image_url(recipe, rendition, image_format):
+    """
+    Возвращает URL копии изображения рецепта, а пока копии не готовы или
+    относятся к прежнему файлу, URL оригинала.
+    """
+
+    renditions = recipe.image_renditions or {}
+    if renditions.get('source') == recipe.image.name:
+        name = renditions.get(rendition, {}).get(image_format)
+        if name:
+            return recipe.image.storage.url(name)
+    return recipe.image.url
@@ -0,0 +1,174 @@
+"""
+Префиксный индекс ингредиентов для автодополнения.
+
+Индекс хранится в файле, который отображается в память (mmap) каждым
+процессом gunicorn, поэтому страницы файла разделяются между воркерами
+через страничный кэш ОС. Формат файла:
+
+    заголовок: MAGIC, количество записей N (uint32)
+    таблица смещений: N * uint32 — начало каждой записи в блоке данных
+    блок данных: записи «ключ\\x1fid\\x1fname\\x1fmeasurement_unit\\n»,
+    отсортированные по ключу (название в нижнем регистре, UTF-8).
+
+Имя файла содержит версию данных ингредиентов, при изменении ингредиентов
+версия меняется и индекс перестраивается при следующем запросе.
+"""
+import mmap
+import os
+import struct
+import threading
+from glob import glob
+
+from django.conf import settings
+
+from foodgram_backend.metrics import record_cache
+from .data_versions import INGREDIENTS_DATA, get_data_version
+from .models import Ingredient
+
+FIELD_SEPARATOR = b'\x1f'
+HEADER = struct.Struct('<4sI')
+MAGIC = b'FGI1'
+OFFSET = struct.Struct('<I')
+RECORD_SEPARATOR = b'\n'
+
+_index = None
+
+
+def make_key(value):
+    return value.lower().encode()
+
+
+def clean(value):
+    return value.replace('\x1f', ' ').replace('\n', ' ')
+
+
+def get_index_path(version):
+    return os.path.join(
+        settings.SHARED_CACHE_DIR, f'{INGREDIENTS_DATA}-{version}.idx'
+    )
+
+
+def build_index(version):
+    """Строит файл индекса из таблицы ингредиентов."""
+
+    records = sorted(
+        FIELD_SEPARATOR.join((
+            make_key(clean(name)), str(pk).encode(), clean(name).encode(),
+            clean(measurement_unit).encode()
+        )) + RECORD_SEPARATOR
+        for pk, name, measurement_unit in Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit'
+        ).iterator()
+    )
+    offsets = []
+    position = 0
+    for record in records:
+        offsets.append(OFFSET.pack(position))
+        position += len(record)
+
+    path = get_index_path(version)
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    os.makedirs(settings.SHARED_CACHE_DIR, exist_ok=True)
+    with open(temp_path, 'wb') as file:
+        file.write(HEADER.pack(MAGIC, len(records)))
+        file.writelines(offsets)
+        file.writelines(records)
+    os.replace(temp_path, path)
+
+    for stale_path in glob(get_index_path('*')):
+        if stale_path != path:
+            try:
+                os.remove(stale_path)
+            except FileNotFoundError:
+                pass
+    return path
+
+
+class IngredientIndex:
+    """Отображенный в память индекс одной версии данных."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            self.buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.count = HEADER.unpack_from(self.buffer)
+        if magic != MAGIC:
+            raise ValueError(f'Неверный формат индекса: {path}')
+        self.data_start = HEADER.size + OFFSET.size * self.count
+
+    def get_offset(self, number):
+        return self.data_start + OFFSET.unpack_from(
+            self.buffer, HEADER.size + OFFSET.size * number
+        )[0]
+
+    def get_key(self, number):
+        start = self.get_offset(number)
+        return self.buffer[start:self.buffer.find(FIELD_SEPARATOR, start)]
+
+    def get_record(self, start):
+        end = self.buffer.find(RECORD_SEPARATOR, start)
+        _, pk, name, measurement_unit = self.buffer[start:end].split(
+            FIELD_SEPARATOR
+        )
+        return {
+            'id': int(pk),
+            'name': name.decode(),
+            'measurement_unit': measurement_unit.decode()
+        }
+
+    def lower_bound(self, key):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.get_key(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def search(self, query):
+        """
+        Возвращает ингредиенты, название которых начинается с query, а затем
+        ингредиенты, название которых содержит query.
+        """
+
+        key = make_key(query)
+        if not key:
+            return []
+        results = []
+        number = self.lower_bound(key)
+        while number < self.count and self.get_key(number).startswith(key):
+            results.append(self.get_record(self.get_offset(number)))
+            number += 1
+
+        position = self.buffer.find(key, self.data_start)
+        while position != -1:
+            start = self.buffer.rfind(
+                RECORD_SEPARATOR, self.data_start, position
+            ) + 1 or self.data_start
+            key_end = self.buffer.find(FIELD_SEPARATOR, start)
+            if start < position < key_end:
+                results.append(self.get_record(start))
+            position = self.buffer.find(
+                key, self.buffer.find(RECORD_SEPARATOR, position) + 1
+            )
+        return results
+
+
+def get_index():
+    """Возвращает индекс актуальной версии, при необходимости строит его."""
+
+    global _index
+    version = get_data_version(INGREDIENTS_DATA)
+    hit = _index is not None and _index[0] == version
+    record_cache('ingredient_index', hit)
+    if hit:
+        return _index[1]
+    path = get_index_path(version)
+    if not os.path.exists(path):
+        build_index(version)
+    _index = (version, IngredientIndex(path))
+    return _index[1]
+
+
+def search_ingredients(query):
+    return get_index().search(query)
@@ -0,0 +1,198 @@
+import json
+import random
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from recipes.constants import (BENCHMARK_CONCURRENCY, BENCHMARK_REQUESTS,
+                               PAGE_SIZE)
+from recipes.models import Ingredient, Recipe
+from users.models import User
+
+INGREDIENT_PREFIXES = ('а', 'мо', 'сах', 'кар', 'со', 'п', 'мука', 'яйц')
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(values, rank):
+    """Перцентиль по методу ближайшего ранга."""
+
+    ordered = sorted(values)
+    index = max(0, -(-rank * len(ordered) // 100) - 1)
+    return ordered[index]
+
+
+def get_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True,
+            cwd=settings.BASE_DIR
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест основных эндпоинтов через тестовый клиент Django. '
+        'Сохраняет перцентили задержки, число запросов к БД и пропускную '
+        'способность в JSON-отчет для сравнения между коммитами'
+    )
+
+    ENDPOINTS = (
+        'recipes', 'subscriptions', 'download_shopping_cart', 'ingredients'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=BENCHMARK_REQUESTS,
+            help='Количество запросов к каждому эндпоинту'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=BENCHMARK_CONCURRENCY
+        )
+        parser.add_argument(
+            '--endpoints',
+            nargs='+',
+            choices=self.ENDPOINTS,
+            default=self.ENDPOINTS
+        )
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--seed', type=int, default=0)
+
+    @staticmethod
+    def get_url(endpoint, pages):
+        if endpoint == 'recipes':
+            return f'/api/recipes/?page={random.randint(1, pages)}'
+        if endpoint == 'subscriptions':
+            return '/api/users/subscriptions/?limit=3'
+        if endpoint == 'download_shopping_cart':
+            return '/api/recipes/download_shopping_cart/'
+        return f'/api/ingredients/?name={random.choice(INGREDIENT_PREFIXES)}'
+
+    @staticmethod
+    def run_worker(tasks):
+        """Выполняет запросы в отдельном потоке со своим соединением с БД."""
+
+        client = APIClient()
+        samples = []
+        try:
+            for endpoint, user, url in tasks:
+                client.force_authenticate(user)
+                with CaptureQueriesContext(connection) as queries:
+                    started = time.perf_counter()
+                    response = client.get(url)
+                    if response.streaming:
+                        size = sum(map(len, response.streaming_content))
+                    else:
+                        size = len(response.content)
+                    elapsed = time.perf_counter() - started
+                samples.append({
+                    'endpoint': endpoint,
+                    'status': response.status_code,
+                    'duration': elapsed,
+                    'queries': len(queries),
+                    'size': size
+                })
+        finally:
+            connection.close()
+        return samples
+
+    @staticmethod
+    def summarize(samples, wall_time):
+        durations = [sample['duration'] * 1000 for sample in samples]
+        queries = [sample['queries'] for sample in samples]
+        summary = {
+            'requests': len(samples),
+            'errors': sum(sample['status'] >= 400 for sample in samples),
+            'throughput_rps': round(len(samples) / wall_time, 2),
+            'latency_ms': {
+                f'p{rank}': round(percentile(durations, rank), 2)
+                for rank in PERCENTILES
+            },
+            'queries_per_request': {
+                'mean': round(sum(queries) / len(queries), 2),
+                'max': max(queries)
+            },
+            'response_bytes_mean': round(
+                sum(sample['size'] for sample in samples) / len(samples)
+            )
+        }
+        summary['latency_ms']['mean'] = round(
+            sum(durations) / len(durations), 2
+        )
+        return summary
+
+    def run_endpoint(self, endpoint, users, pages, options):
+        tasks = [
+            (endpoint, random.choice(users), self.get_url(endpoint, pages))
+            for _ in range(options['requests'])
+        ]
+        concurrency = options['concurrency']
+        chunks = [tasks[index::concurrency] for index in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            samples = [
+                sample
+                for worker_samples in executor.map(self.run_worker, chunks)
+                for sample in worker_samples
+            ]
+        return self.summarize(samples, time.perf_counter() - started)
+
+    def handle(self, *args, **options):
+        if options['requests'] <= 0 or options['concurrency'] <= 0:
+            raise CommandError(
+                'Количество запросов и потоков должно быть положительным'
+            )
+        random.seed(options['seed'])
+        users = list(
+            User.objects.filter(shoppingcart__isnull=False).distinct()[
+                :options['concurrency'] * 10
+            ]
+        )
+        if not users or not Ingredient.objects.exists():
+            raise CommandError(
+                'Нет данных для теста: выполните generate_data'
+            )
+        pages = max(1, Recipe.objects.count() // PAGE_SIZE)
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for endpoint in options['endpoints']:
+                results[endpoint] = self.run_endpoint(
+                    endpoint, users, pages, options
+                )
+                latency = results[endpoint]['latency_ms']
+                self.stdout.write(
+                    f'{endpoint}: p50 {latency["p50"]} мс, '
+                    f'p95 {latency["p95"]} мс, p99 {latency["p99"]} мс, '
+                    f'запросов к БД '
+                    f'{results[endpoint]["queries_per_request"]["mean"]}, '
+                    f'{results[endpoint]["throughput_rps"]} запр./с, '
+                    f'ошибок {results[endpoint]["errors"]}'
+                )
+
+        report = {
+            'commit': get_commit(),
+            'created': datetime.now(timezone.utc).isoformat(),
+            'database': connection.vendor,
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'endpoints': results
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f'Отчет сохранен в {options["output"]}'
+        ))
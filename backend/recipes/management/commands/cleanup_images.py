@@ -0,0 +1,151 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from recipes.constants import (IMAGE_RENDITIONS_DIR,
+                               IMAGES_CLEANUP_GRACE_HOURS,
+                               IMAGES_CLEANUP_SHARDS)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет файлы изображений, на которые не ссылается ни один рецепт. '
+        'За один запуск обрабатывает несколько шардов (каталогов ab/) и '
+        'продолжает с места остановки при следующем запуске'
+    )
+
+    CHECKPOINT_FILE = 'cleanup_images.checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--shards',
+            type=int,
+            default=IMAGES_CLEANUP_SHARDS,
+            help='Количество шардов за запуск, 0 — все'
+        )
+        parser.add_argument(
+            '--grace-hours',
+            type=int,
+            default=IMAGES_CLEANUP_GRACE_HOURS,
+            help='Не трогать файлы моложе указанного количества часов'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Только показать, что будет удалено'
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Начать обход с первого шарда'
+        )
+
+    @staticmethod
+    def get_shards():
+        """
+        Шард — каталог первого уровня хэш-хранилища (images/ab) или корень
+        каталога с файлами, сохраненными до перехода на хэш-имена.
+        """
+
+        shards = []
+        for directory in (
+            Recipe._meta.get_field('image').upload_to, IMAGE_RENDITIONS_DIR
+        ):
+            shards.append((directory, False))
+            shards.extend(
+                (f'{directory}/{prefix:02x}', True) for prefix in range(256)
+            )
+        return shards
+
+    @staticmethod
+    def get_checkpoint_path():
+        return os.path.join(settings.SHARED_CACHE_DIR, Command.CHECKPOINT_FILE)
+
+    def read_checkpoint(self):
+        try:
+            with open(self.get_checkpoint_path()) as file:
+                return int(file.read())
+        except (OSError, ValueError):
+            return 0
+
+    def write_checkpoint(self, position):
+        os.makedirs(settings.SHARED_CACHE_DIR, exist_ok=True)
+        with open(self.get_checkpoint_path(), 'w') as file:
+            file.write(str(position))
+
+    @staticmethod
+    def get_referenced(shards):
+        """
+        Собирает имена файлов, на которые ссылаются рецепты, только для
+        обрабатываемых шардов, чтобы не держать в памяти весь каталог.
+        """
+
+        prefixes = tuple(f'{path}/' for path, _ in shards)
+        referenced = set()
+        for image, renditions in Recipe.objects.values_list(
+            'image', 'image_renditions'
+        ).iterator():
+            names = [image] + [
+                name for formats in renditions.values()
+                if isinstance(formats, dict) for name in formats.values()
+            ]
+            referenced.update(
+                name for name in names if name.startswith(prefixes)
+            )
+        return referenced
+
+    @staticmethod
+    def scan(path, recursive):
+        """Возвращает имена файлов шарда в хранилище и их stat."""
+
+        root = default_storage.path(path)
+        if not os.path.isdir(root):
+            return
+        if recursive:
+            entries = (
+                os.path.join(directory, filename)
+                for directory, _, filenames in os.walk(root)
+                for filename in filenames
+            )
+        else:
+            entries = (
+                entry.path for entry in os.scandir(root) if entry.is_file()
+            )
+        for file_path in entries:
+            name = os.path.relpath(file_path, default_storage.location)
+            yield name.replace(os.sep, '/'), os.stat(file_path)
+
+    def handle(self, *args, **options):
+        shards = self.get_shards()
+        start = 0 if options['reset'] else self.read_checkpoint()
+        count = min(options['shards'] or len(shards), len(shards))
+        selected = [
+            shards[(start + offset) % len(shards)] for offset in range(count)
+        ]
+        referenced = self.get_referenced(selected)
+        cutoff = time.time() - options['grace_hours'] * 3600
+
+        scanned = deleted = freed = 0
+        for path, recursive in selected:
+            for name, stat in self.scan(path, recursive):
+                scanned += 1
+                if name in referenced or stat.st_mtime > cutoff:
+                    continue
+                deleted += 1
+                freed += stat.st_size
+                if options['dry_run']:
+                    self.stdout.write(name)
+                else:
+                    default_storage.delete(name)
+
+        if not options['dry_run']:
+            self.write_checkpoint((start + count) % len(shards))
+        self.stdout.write(self.style.SUCCESS(
+            f'Шардов: {count}, файлов проверено: {scanned}, '
+            f'{"к удалению" if options["dry_run"] else "удалено"}: '
+            f'{deleted} ({freed} байт)'
+        ))
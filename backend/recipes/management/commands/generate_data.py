@@ -0,0 +1,219 @@
+import random
+from io import BytesIO
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from PIL import Image
+
+from recipes.constants import GENERATE_DATA_BATCH_SIZE
+from recipes.models import (Favorites, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTag, ShoppingCart, ShoppingCartIngredient,
+                            Tag)
+from users.models import Subscribe, User
+
+DEFAULT_TAGS = (
+    ('Завтрак', 'breakfast', '#E26C2D'),
+    ('Обед', 'lunch', '#49B64E'),
+    ('Ужин', 'dinner', '#8775D2'),
+    ('Десерт', 'dessert', '#D2B48C'),
+    ('Выпечка', 'bakery', '#C0392B'),
+)
+PASSWORD = 'benchmark-password'
+TEXT_WORDS = (
+    'нарезать', 'смешать', 'обжарить', 'добавить', 'варить', 'запекать',
+    'посолить', 'поперчить', 'подавать', 'горячим', 'минут', 'до',
+    'готовности', 'на', 'среднем', 'огне', 'тесто', 'соус', 'овощи', 'мясо',
+)
+
+
+def zipf_weights(count, exponent=1.1):
+    """Веса популярности: немногие объекты встречаются часто, большинство —
+    редко, как в реальных данных."""
+
+    return [1 / (rank + 1) ** exponent for rank in range(count)]
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, рецептами, '
+        'избранным, списками покупок и подписками для нагрузочных тестов'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument('--favorites-per-user', type=int, default=20)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument('--subscriptions-per-user', type=int, default=10)
+        parser.add_argument(
+            '--ingredients',
+            default=str(settings.BASE_DIR.parent / 'data' / 'ingredients.csv'),
+            help='Файл для load_ingredients, если справочник пуст'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=GENERATE_DATA_BATCH_SIZE
+        )
+
+    def bulk_create(self, model, objects, **kwargs):
+        return model.objects.bulk_create(
+            objects, batch_size=self.batch_size, **kwargs
+        )
+
+    def get_tags(self):
+        if not Tag.objects.exists():
+            self.bulk_create(
+                Tag,
+                [
+                    Tag(name=name, slug=slug, color=color)
+                    for name, slug, color in DEFAULT_TAGS
+                ]
+            )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def get_ingredients(self, path):
+        if not Ingredient.objects.exists():
+            try:
+                call_command('load_ingredients', path, stdout=self.stdout)
+            except FileNotFoundError:
+                raise CommandError(f'Файл ингредиентов не найден: {path}')
+        return list(Ingredient.objects.values_list('id', flat=True))
+
+    @staticmethod
+    def get_image():
+        """Одно изображение на все рецепты: хранилище хранит его один раз."""
+
+        buffer = BytesIO()
+        Image.new('RGB', (1200, 800), (230, 160, 90)).save(buffer, 'JPEG')
+        return default_storage.save(
+            'images/benchmark.jpg', ContentFile(buffer.getvalue())
+        )
+
+    def create_users(self, count):
+        start = User.objects.count()
+        password = make_password(PASSWORD)
+        users = self.bulk_create(
+            User,
+            [
+                User(
+                    username=f'bench_{start + number}',
+                    email=f'bench_{start + number}@example.com',
+                    first_name='Имя',
+                    last_name=f'Фамилия {start + number}',
+                    password=password
+                )
+                for number in range(count)
+            ]
+        )
+        return [user.id for user in User.objects.filter(
+            username__in=[user.username for user in users]
+        ).order_by('id')]
+
+    def create_recipes(self, count, user_ids, tag_ids, ingredient_ids):
+        random.shuffle(ingredient_ids)
+        image = self.get_image()
+        authors = random.choices(
+            user_ids, weights=zipf_weights(len(user_ids)), k=count
+        )
+        recipes = self.bulk_create(
+            Recipe,
+            [
+                Recipe(
+                    author_id=author_id,
+                    name=f'Рецепт {number}',
+                    text=' '.join(random.choices(TEXT_WORDS, k=40)),
+                    cooking_time=random.randint(5, 180),
+                    image=image
+                )
+                for number, author_id in enumerate(authors)
+            ]
+        )
+        recipe_ids = list(
+            Recipe.objects.filter(image=image).order_by('-id').values_list(
+                'id', flat=True
+            )[:len(recipes)]
+        )
+        ingredient_weights = zipf_weights(len(ingredient_ids))
+        recipe_ingredients = []
+        recipe_tags = []
+        for recipe_id in recipe_ids:
+            chosen = set(random.choices(
+                ingredient_ids,
+                weights=ingredient_weights,
+                k=max(1, int(random.gauss(9, 3)))
+            ))
+            recipe_ingredients.extend(
+                RecipeIngredient(
+                    recipe_id=recipe_id,
+                    ingredient_id=ingredient_id,
+                    amount=random.randint(1, 500)
+                )
+                for ingredient_id in chosen
+            )
+            recipe_tags.extend(
+                RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+                for tag_id in random.sample(
+                    tag_ids, random.randint(1, min(3, len(tag_ids)))
+                )
+            )
+        self.bulk_create(RecipeIngredient, recipe_ingredients)
+        self.bulk_create(RecipeTag, recipe_tags)
+        return recipe_ids
+
+    def create_relations(self, model, fields, user_ids, targets, per_user):
+        """Связывает пользователей с популярными объектами (Zipf)."""
+
+        user_field, target_field = fields
+        weights = zipf_weights(len(targets))
+        objects = []
+        for user_id in user_ids:
+            for target_id in set(random.choices(
+                targets, weights=weights, k=per_user
+            )):
+                if target_id == user_id and model is Subscribe:
+                    continue
+                objects.append(
+                    model(**{user_field: user_id, target_field: target_id})
+                )
+        self.bulk_create(model, objects, ignore_conflicts=True)
+        return len(objects)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        self.batch_size = options['batch_size']
+
+        tag_ids = self.get_tags()
+        ingredient_ids = self.get_ingredients(options['ingredients'])
+        user_ids = self.create_users(options['users'])
+        recipe_ids = self.create_recipes(
+            options['recipes'], user_ids, tag_ids, ingredient_ids
+        )
+        favorites = self.create_relations(
+            Favorites, ('user_id', 'recipe_id'), user_ids, recipe_ids,
+            options['favorites_per_user']
+        )
+        carts = self.create_relations(
+            ShoppingCart, ('user_id', 'recipe_id'), user_ids, recipe_ids,
+            options['cart_per_user']
+        )
+        subscriptions = self.create_relations(
+            Subscribe, ('subscriber_id', 'author_id'), user_ids, user_ids,
+            options['subscriptions_per_user']
+        )
+
+        ShoppingCartIngredient.objects.rebuild(user_ids)
+        call_command('reconcile_counters', stdout=self.stdout)
+        call_command('rebuild_search_index', stdout=self.stdout)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано пользователей: {len(user_ids)}, рецептов: '
+            f'{len(recipe_ids)}, избранного: {favorites}, списков покупок: '
+            f'{carts}, подписок: {subscriptions}. Пароль пользователей: '
+            f'{PASSWORD}'
+        ))
@@ -0,0 +1,196 @@
+import csv
+import io
+import json
+import os
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.constants import INGREDIENTS_LOAD_BATCH_SIZE
+from recipes.data_versions import INGREDIENTS_DATA, bump_data_version
+from recipes.models import Ingredient
+
+CSV_FORMAT = 'csv'
+JSON_FORMAT = 'json'
+NDJSON_FORMAT = 'ndjson'
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) >= 2 and row[:2] != ['name', 'measurement_unit']:
+            yield row[0], row[1]
+
+
+def read_ndjson(file):
+    for line in file:
+        if line.strip():
+            item = json.loads(line)
+            yield item['name'], item['measurement_unit']
+
+
+def read_json(file):
+    """
+    Читает JSON-массив объектов по частям, не загружая файл целиком:
+    объекты разбираются из буфера по мере чтения.
+    """
+
+    decoder = json.JSONDecoder()
+    buffer = ''
+    position = 0
+    started = False
+    for chunk in iter(lambda: file.read(READ_CHUNK_SIZE), ''):
+        buffer = buffer[position:] + chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise CommandError('Ожидается JSON-массив')
+                started = True
+                position += 1
+                continue
+            if position >= len(buffer) or buffer[position] == ']':
+                break
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                break
+            yield item['name'], item['measurement_unit']
+    if buffer[position:].strip() not in ('', ']'):
+        raise CommandError('Некорректный JSON')
+
+
+READERS = {
+    CSV_FORMAT: read_csv,
+    JSON_FORMAT: read_json,
+    NDJSON_FORMAT: read_ndjson,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV, JSON или NDJSON потоково, пачками, '
+        'пропуская уже существующие пары название — единица измерения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу с ингредиентами')
+        parser.add_argument(
+            '--format',
+            choices=READERS,
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=INGREDIENTS_LOAD_BATCH_SIZE
+        )
+        parser.add_argument('--encoding', default='utf-8')
+
+    @staticmethod
+    def get_rows(reader, file):
+        """Нормализует строки и отбрасывает повторы внутри файла."""
+
+        seen = set()
+        for name, measurement_unit in reader(file):
+            row = (name.strip(), measurement_unit.strip())
+            if row[0] and row not in seen:
+                seen.add(row)
+                yield row
+
+    @staticmethod
+    def batches(rows, batch_size):
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                return
+            yield batch
+
+    @staticmethod
+    def load_copy(batches):
+        """
+        PostgreSQL: пачки передаются через COPY во временную таблицу, затем
+        одним INSERT ... ON CONFLICT DO NOTHING переносятся в справочник.
+        """
+
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredients_load '
+                '(name text, measurement_unit text) ON COMMIT DROP'
+            )
+            for batch in batches:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(batch)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredients_load (name, measurement_unit) '
+                    'FROM STDIN WITH CSV',
+                    buffer
+                )
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT name, measurement_unit FROM ingredients_load '
+                'ON CONFLICT (name, measurement_unit) DO NOTHING'
+            )
+            return cursor.rowcount
+
+    @staticmethod
+    def load_bulk_create(batches, batch_size):
+        before = Ingredient.objects.count()
+        for batch in batches:
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in batch
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=True
+            )
+        return Ingredient.objects.count() - before
+
+    def handle(self, *args, **options):
+        path = options['path']
+        data_format = (
+            options['format']
+            or os.path.splitext(path)[1].lstrip('.').lower()
+        )
+        if data_format not in READERS:
+            raise CommandError(
+                'Не удалось определить формат файла, укажите --format'
+            )
+
+        started = time.monotonic()
+        read = 0
+
+        def counted(rows):
+            nonlocal read
+            for row in rows:
+                read += 1
+                yield row
+
+        with open(path, encoding=options['encoding'], newline='') as file:
+            batches = self.batches(
+                counted(self.get_rows(READERS[data_format], file)),
+                options['batch_size']
+            )
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    created = self.load_copy(batches)
+                else:
+                    created = self.load_bulk_create(
+                        batches, options['batch_size']
+                    )
+        bump_data_version(INGREDIENTS_DATA)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано уникальных строк: {read}, добавлено: {created}, '
+            f'уже были: {read - created}. '
+            f'{elapsed:.2f} с, {read / elapsed if elapsed else read:.0f} '
+            f'строк/с'
+        ))
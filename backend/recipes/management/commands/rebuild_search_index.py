@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+
+from recipes.constants import SEARCH_INDEX_BATCH_SIZE
+from recipes.models import Recipe
+from recipes.search import index_recipes
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает поисковый индекс рецептов '
+        '(для баз данных кроме PostgreSQL)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SEARCH_INDEX_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        recipes = Recipe.objects.only('id', 'name', 'text').order_by('id')
+        last_id = 0
+        indexed = 0
+        while True:
+            batch = list(recipes.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                break
+            index_recipes(batch)
+            indexed += len(batch)
+            last_id = batch[-1].id
+        self.stdout.write(self.style.SUCCESS(
+            f'Проиндексировано рецептов: {indexed}'
+        ))
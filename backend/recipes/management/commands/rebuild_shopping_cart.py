@@ -0,0 +1,60 @@
+from django.core.management.base import BaseCommand
+
+from recipes.constants import SHOPPING_CART_BATCH_SIZE
+from recipes.models import ShoppingCartIngredient
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Перестраивает или проверяет агрегат ингредиентов списков покупок'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только сравнить агрегат с корзинами, ничего не изменяя'
+        )
+        parser.add_argument(
+            '--user',
+            action='append',
+            type=int,
+            dest='user_ids',
+            help='id пользователя (можно указать несколько раз)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=SHOPPING_CART_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id').values_list('id', flat=True)
+        if options['user_ids']:
+            users = users.filter(id__in=options['user_ids'])
+        user_ids = list(users)
+        batch_size = options['batch_size']
+        mismatched = 0
+
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start:start + batch_size]
+            if not options['verify']:
+                ShoppingCartIngredient.objects.rebuild(batch)
+                continue
+            actual = ShoppingCartIngredient.objects.get_actual_amounts(batch)
+            stored = ShoppingCartIngredient.objects.get_stored_amounts(batch)
+            difference = actual.items() ^ stored.items()
+            for user_id in sorted({key[0] for key, _ in difference}):
+                mismatched += 1
+                self.stdout.write(f'Расхождение у пользователя {user_id}')
+
+        if options['verify']:
+            self.stdout.write(self.style.SUCCESS(
+                f'Проверено пользователей: {len(user_ids)}, '
+                f'с расхождениями: {mismatched}'
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f'Агрегат перестроен для {len(user_ids)} пользователей'
+            ))
@@ -0,0 +1,88 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.constants import COUNTERS_BATCH_SIZE
+from recipes.models import Favorites, Recipe, ShoppingCart
+from users.models import Subscribe, User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сверяет счетчики рецептов и пользователей с данными и исправляет '
+        'расхождения'
+    )
+
+    COUNTERS = (
+        (Recipe, 'favorites_count', Favorites, 'recipe'),
+        (Recipe, 'shopping_cart_count', ShoppingCart, 'recipe'),
+        (User, 'followers_count', Subscribe, 'author'),
+        (User, 'recipes_count', Recipe, 'author'),
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Только найти расхождения, ничего не изменяя'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=COUNTERS_BATCH_SIZE
+        )
+
+    def handle(self, *args, **options):
+        for model, field, related_model, related_field in self.COUNTERS:
+            mismatched = self.reconcile(
+                model, field, related_model, related_field,
+                options['batch_size'], options['verify']
+            )
+            self.stdout.write(
+                f'{model.__name__}.{field}: расхождений {mismatched}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Проверка завершена' if options['verify']
+            else 'Счетчики исправлены'
+        ))
+
+    @staticmethod
+    def count_subquery(related_model, related_field):
+        return Coalesce(
+            Subquery(
+                related_model.objects.filter(
+                    **{related_field: OuterRef('pk')}
+                ).order_by().values(related_field).annotate(
+                    count=Count('*')
+                ).values('count')
+            ),
+            0
+        )
+
+    def reconcile(self, model, field, related_model, related_field,
+                  batch_size, verify):
+        """
+        Проходит таблицу пачками по возрастанию id и пересчитывает только
+        счетчики с расхождениями. Исправление выполняется одним UPDATE с
+        подзапросом, поэтому значение считается в момент записи.
+        """
+
+        actual = self.count_subquery(related_model, related_field)
+        ids = model.objects.order_by('id').values_list('id', flat=True)
+        mismatched = 0
+        last_id = 0
+        while True:
+            batch = list(ids.filter(id__gt=last_id)[:batch_size])
+            if not batch:
+                return mismatched
+            last_id = batch[-1]
+            drifted = list(
+                model.objects.filter(id__in=batch).annotate(
+                    actual=actual
+                ).exclude(
+                    **{field: F('actual')}
+                ).values_list('id', flat=True)
+            )
+            mismatched += len(drifted)
+            if drifted and not verify:
+                model.objects.filter(id__in=drifted).update(**{field: actual})
@@ -0,0 +1,151 @@
+import gzip
+import re
+from hashlib import sha1
+from time import perf_counter
+
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from foodgram_backend.metrics import record_cache
+from .data_versions import get_data_version
+
+ACCEPTS_GZIP = re.compile(r'\bgzip\b')
+
+
+class PrerenderedPayload:
+    """Готовое тело ответа: JSON, его gzip-версия и ETag каждой из них."""
+
+    def __init__(self, content):
+        self.content = content
+        self.compressed = gzip.compress(content, mtime=0)
+        digest = sha1(content).hexdigest()
+        self.etag = f'"{digest}"'
+        self.compressed_etag = f'"{digest}-gzip"'
+
+
+class PrerenderedListMixin:
+    """
+    Миксин для справочников, которые почти не меняются: список
+    сериализуется и сжимается один раз на версию данных и хранится в памяти
+    процесса. Версия меняется при любой записи в таблицу (см. signals),
+    клиенты и nginx перепроверяют ответ по ETag и получают 304.
+    """
+
+    CACHE_CONTROL = 'no-cache'
+
+    data_name = None
+    _payloads = {}
+
+    def get_payload(self):
+        version = get_data_version(self.data_name)
+        cached = self._payloads.get(self.data_name)
+        hit = cached is not None and cached[0] == version
+        record_cache('prerendered_list', hit)
+        if hit:
+            return cached[1]
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        payload = PrerenderedPayload(JSONRenderer().render(serializer.data))
+        self._payloads[self.data_name] = (version, payload)
+        return payload
+
+    def list(self, request, *args, **kwargs):
+        payload = self.get_payload()
+        if ACCEPTS_GZIP.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            content, etag = payload.compressed, payload.compressed_etag
+        else:
+            content, etag = payload.content, payload.etag
+
+        client_etags = {
+            tag[2:] if tag.startswith('W/') else tag
+            for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        }
+        if etag in client_etags or '*' in client_etags:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
+            if content is payload.compressed:
+                response['Content-Encoding'] = 'gzip'
+        response['ETag'] = etag
+        response['Cache-Control'] = self.CACHE_CONTROL
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class VaryOnAcceptMixin:
+    """
+    Миксин вьюсета: ответ зависит от заголовка Accept (формат изображений),
+    поэтому кэши должны хранить варианты раздельно.
+    """
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
+        )
+        patch_vary_headers(response, ('Accept',))
+        return response
+
+
+class SerializationTimingMixin:
+    """
+    Миксин вьюсета: если включен SERVER_TIMING, время построения
+    serializer.data учитывается отдельным этапом serialize в Server-Timing
+    (см. ServerTimingMiddleware). Стандартные действия повторяют действия
+    DRF, но читают данные через get_serializer_data, собственные действия
+    вьюсетов должны делать так же.
+    """
+
+    def get_serializer_data(self, serializer):
+        timing = getattr(self.request, '_timing', None)
+        if timing is None:
+            return serializer.data
+        started = perf_counter()
+        try:
+            return serializer.data
+        finally:
+            timing['serialize'] = (
+                timing.get('serialize', 0) + perf_counter() - started
+            )
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(
+                self.get_serializer_data(self.get_serializer(page, many=True))
+            )
+        return Response(
+            self.get_serializer_data(self.get_serializer(queryset, many=True))
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(
+            self.get_serializer_data(self.get_serializer(self.get_object()))
+        )
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self.perform_create(serializer)
+        data = self.get_serializer_data(serializer)
+        return Response(
+            data,
+            status=status.HTTP_201_CREATED,
+            headers=self.get_success_headers(data)
+        )
+
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(
+            instance, data=request.data, partial=partial
+        )
+        serializer.is_valid(raise_exception=True)
+        self.perform_update(serializer)
+        if getattr(instance, '_prefetched_objects_cache', None):
+            # Кэш prefetch_related устарел после изменения объекта.
+            instance._prefetched_objects_cache = {}
+        return Response(self.get_serializer_data(serializer))
@@ -1,10 +1,117 @@
 from colorfield.fields import ColorField
+from django.contrib.postgres.search import SearchVector
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models import F, Sum
 
-from users.models import User
+from users.models import User, update_counter
 from .constants import (INGREDIENTS_MIN_VALUE, NAME_SLUG_MEASURE_MAX_LENGTH,
-                        POSITIVE_SMALL_MAX, TIME_MIN_VALUE)
+                        POSITIVE_SMALL_MAX, SEARCH_CONFIG,
+                        SEARCH_TERM_MAX_LENGTH, SHOPPING_CART_BATCH_SIZE,
+                        TIME_MIN_VALUE)
+
+# GIN-индекс по этому выражению создается миграцией 0003_recipe_search
+# только в PostgreSQL и не хранится в состоянии модели.
+RECIPE_SEARCH_VECTOR = (
+    SearchVector('name', config=SEARCH_CONFIG, weight='A')
+    + SearchVector('text', config=SEARCH_CONFIG, weight='B')
+)
+
+
+class RecipeUserManager(models.Manager):
+    """
+    Менеджер избранного и списка покупок. Добавление и удаление выполняются
+    одним запросом (INSERT ... ON CONFLICT DO NOTHING / DELETE ... RETURNING),
+    поэтому повторные и параллельные запросы не приводят к ошибкам
+    уникальности. Зависимые данные (счетчик рецепта из counter_field)
+    обновляются в той же транзакции в recipes_added и recipes_removed,
+    которые также вызываются сигналами при изменениях через ORM.
+    """
+
+    counter_field = None
+
+    def update_counter(self, recipe_ids, delta):
+        if self.counter_field and recipe_ids:
+            update_counter(
+                Recipe.objects.filter(id__in=recipe_ids),
+                self.counter_field,
+                delta
+            )
+
+    def recipes_added(self, user_id, recipe_ids):
+        self.update_counter(recipe_ids, 1)
+
+    def recipes_removed(self, user_id, recipe_ids):
+        self.update_counter(recipe_ids, -1)
+
+    def execute_returning(self, sql, params):
+        connection = connections[self.db]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql.format(
+                    table=connection.ops.quote_name(self.model._meta.db_table),
+                    recipe_table=connection.ops.quote_name(
+                        Recipe._meta.db_table
+                    )
+                ),
+                params
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def add_recipes(self, user, recipe_ids):
+        """Добавляет рецепты в список и возвращает id добавленных."""
+
+        if not recipe_ids:
+            return []
+        with transaction.atomic():
+            added = self.execute_returning(
+                'INSERT INTO {table} (user_id, recipe_id) '
+                'SELECT %s, id FROM {recipe_table} '
+                f'WHERE id IN ({", ".join(["%s"] * len(recipe_ids))}) '
+                'ON CONFLICT (recipe_id, user_id) DO NOTHING '
+                'RETURNING recipe_id',
+                [user.id, *recipe_ids]
+            )
+            self.recipes_added(user.id, added)
+        return added
+
+    def remove_recipes(self, user, recipe_ids):
+        """Удаляет рецепты из списка и возвращает id удаленных."""
+
+        if not recipe_ids:
+            return []
+        with transaction.atomic():
+            removed = self.execute_returning(
+                'DELETE FROM {table} WHERE user_id = %s '
+                f'AND recipe_id IN ({", ".join(["%s"] * len(recipe_ids))}) '
+                'RETURNING recipe_id',
+                [user.id, *recipe_ids]
+            )
+            self.recipes_removed(user.id, removed)
+        return removed
+
+
+class FavoritesManager(RecipeUserManager):
+    """Менеджер избранного, обновляющий счетчик добавлений в избранное."""
+
+    counter_field = 'favorites_count'
+
+
+class ShoppingCartManager(RecipeUserManager):
+    """
+    Менеджер списка покупок, обновляющий агрегат ингредиентов и счетчик
+    добавлений в списки покупок.
+    """
+
+    counter_field = 'shopping_cart_count'
+
+    def recipes_added(self, user_id, recipe_ids):
+        super().recipes_added(user_id, recipe_ids)
+        ShoppingCartIngredient.objects.add_recipes(user_id, recipe_ids)
+
+    def recipes_removed(self, user_id, recipe_ids):
+        super().recipes_removed(user_id, recipe_ids)
+        ShoppingCartIngredient.objects.remove_recipes(user_id, recipe_ids)
 
 
 class RecipeUser(models.Model):
@@ -23,6 +130,8 @@ class RecipeUser(models.Model):
         verbose_name='Пользователь'
     )
 
+    objects = RecipeUserManager()
+
     class Meta:
         abstract = True
         verbose_name = 'Список покупок и избранного'
@@ -34,6 +143,8 @@ class RecipeUser(models.Model):
 class Favorites(RecipeUser):
     """Модель избранного."""
 
+    objects = FavoritesManager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -101,6 +212,17 @@ class Recipe(models.Model):
         upload_to='images',
         verbose_name='Фото блюда'
     )
+    image_renditions = models.JSONField(
+        blank=True,
+        default=dict,
+        editable=False,
+        verbose_name='Копии изображения'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлено в избранное'
+    )
     ingredients = models.ManyToManyField(
         Ingredient,
         through='RecipeIngredient',
@@ -113,6 +235,11 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    shopping_cart_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлено в списки покупок'
+    )
     tags = models.ManyToManyField(
         'Tag',
         through='RecipeTag',
@@ -170,6 +297,41 @@ class RecipeIngredient(models.Model):
         )
 
 
+class RecipeSearchTerm(models.Model):
+    """
+    Инвертированный индекс слов рецептов для полнотекстового поиска на
+    базах данных без встроенного полнотекстового поиска (SQLite).
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Рецепт'
+    )
+    term = models.CharField(
+        db_index=True,
+        max_length=SEARCH_TERM_MAX_LENGTH,
+        verbose_name='Слово'
+    )
+    weight = models.PositiveSmallIntegerField(
+        verbose_name='Вес'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('recipe', 'term'),
+                name='unique_recipe_search_term'
+            )
+        ]
+        verbose_name = 'Слово рецепта'
+        verbose_name_plural = 'Слова рецептов'
+
+    def __str__(self):
+        return f'{self.term} {self.recipe}'
+
+
 class RecipeTag(models.Model):
     """Промежуточная модель тегов для рецепта."""
 
@@ -201,6 +363,8 @@ class RecipeTag(models.Model):
 class ShoppingCart(RecipeUser):
     """Модель списка покупок."""
 
+    objects = ShoppingCartManager()
+
     class Meta:
         constraints = [
             models.UniqueConstraint(
@@ -211,6 +375,193 @@ class ShoppingCart(RecipeUser):
         verbose_name = 'Список покупок'
 
 
+class ShoppingCartIngredientManager(models.Manager):
+    """
+    Поддерживает агрегат списка покупок в актуальном состоянии: вместо
+    пересчета суммы по всем рецептам корзины к строкам прибавляются изменения
+    количества ингредиентов.
+    """
+
+    @staticmethod
+    def get_recipe_amounts(recipe_ids):
+        """Возвращает суммарное количество каждого ингредиента рецептов."""
+
+        return dict(
+            RecipeIngredient.objects.filter(
+                recipe_id__in=recipe_ids
+            ).values('ingredient_id').annotate(
+                total=Sum('amount')
+            ).values_list('ingredient_id', 'total')
+        )
+
+    def apply_rows(self, rows):
+        """
+        Прибавляет изменения (user_id, ingredient_id, delta) к спискам
+        покупок. Каждая строка меняется одним INSERT ... ON CONFLICT DO
+        UPDATE, поэтому параллельные изменения списка одного пользователя не
+        теряются, а упорядоченные строки блокируются всеми транзакциями в
+        одном порядке.
+        """
+
+        rows = sorted(row for row in rows if row[2])
+        if not rows:
+            return
+        connection = connections[self.db]
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        with transaction.atomic(using=self.db), connection.cursor() as cursor:
+            for start in range(0, len(rows), SHOPPING_CART_BATCH_SIZE):
+                batch = rows[start:start + SHOPPING_CART_BATCH_SIZE]
+                cursor.execute(
+                    f'INSERT INTO {table} (user_id, ingredient_id, amount) '
+                    f'VALUES {", ".join(["(%s, %s, %s)"] * len(batch))} '
+                    'ON CONFLICT (user_id, ingredient_id) DO UPDATE '
+                    f'SET amount = {table}.amount + EXCLUDED.amount',
+                    [value for row in batch for value in row]
+                )
+                self.filter(
+                    user_id__in={user_id for user_id, _, _ in batch},
+                    ingredient_id__in={pk for _, pk, _ in batch},
+                    amount__lte=0
+                ).delete()
+
+    def apply_deltas(self, user_ids, deltas):
+        """Прибавляет одни и те же изменения к спискам пользователей."""
+
+        self.apply_rows(
+            (user_id, ingredient_id, delta)
+            for user_id in set(user_ids)
+            for ingredient_id, delta in deltas.items()
+        )
+
+    def add_recipes(self, user_id, recipe_ids):
+        self.apply_deltas([user_id], self.get_recipe_amounts(recipe_ids))
+
+    def remove_recipes(self, user_id, recipe_ids):
+        self.apply_deltas(
+            [user_id],
+            {
+                ingredient_id: -amount
+                for ingredient_id, amount
+                in self.get_recipe_amounts(recipe_ids).items()
+            }
+        )
+
+    def change_recipe(self, recipe, old_amounts, new_amounts):
+        """Учитывает изменение ингредиентов рецепта во всех корзинах."""
+
+        self.apply_deltas(
+            ShoppingCart.objects.filter(
+                recipe=recipe
+            ).values_list('user_id', flat=True),
+            {
+                ingredient_id: (
+                    new_amounts.get(ingredient_id, 0)
+                    - old_amounts.get(ingredient_id, 0)
+                )
+                for ingredient_id in old_amounts.keys() | new_amounts.keys()
+            }
+        )
+
+    def remove_recipe_ingredients(self, recipe_ingredients):
+        """
+        Вычитает строки ингредиентов рецептов из всех списков покупок, в
+        которых есть эти рецепты, одним запросом на чтение независимо от
+        числа строк.
+        """
+
+        self.apply_rows(
+            (user_id, ingredient_id, -total)
+            for (user_id, ingredient_id), total in self.get_cart_amounts(
+                recipe_ingredients.filter(recipe__shoppingcart__isnull=False)
+            ).items()
+        )
+
+    def remove_deleted_recipes(self, recipe_ids):
+        """Вычитает удаляемые рецепты из всех списков покупок."""
+
+        self.remove_recipe_ingredients(
+            RecipeIngredient.objects.filter(recipe_id__in=recipe_ids)
+        )
+
+    @staticmethod
+    def get_cart_amounts(recipe_ingredients):
+        return {
+            (row['user_id'], row['ingredient_id']): row['total']
+            for row in recipe_ingredients.order_by().values(
+                'ingredient_id', user_id=F('recipe__shoppingcart__user_id')
+            ).annotate(total=Sum('amount'))
+        }
+
+    def get_actual_amounts(self, user_ids):
+        """Пересчитывает агрегат пользователей по содержимому корзин."""
+
+        return self.get_cart_amounts(
+            RecipeIngredient.objects.filter(
+                recipe__shoppingcart__user_id__in=user_ids
+            )
+        )
+
+    def get_stored_amounts(self, user_ids):
+        return {
+            (user_id, ingredient_id): amount
+            for user_id, ingredient_id, amount in self.filter(
+                user_id__in=user_ids
+            ).values_list('user_id', 'ingredient_id', 'amount')
+        }
+
+    def rebuild(self, user_ids):
+        """Перестраивает агрегат пользователей с нуля."""
+
+        amounts = self.get_actual_amounts(user_ids)
+        with transaction.atomic():
+            self.filter(user_id__in=user_ids).delete()
+            self.bulk_create(
+                self.model(
+                    user_id=user_id, ingredient_id=ingredient_id, amount=amount
+                )
+                for (user_id, ingredient_id), amount in amounts.items()
+            )
+
+
+class ShoppingCartIngredient(models.Model):
+    """
+    Суммарное количество ингредиентов в списке покупок пользователя.
+    Обновляется при добавлении и удалении рецептов из корзины, при изменении
+    ингредиентов рецепта и при удалении рецепта (см. signals).
+    """
+
+    amount = models.IntegerField(
+        default=0,
+        verbose_name='Количество'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_cart_ingredients',
+        verbose_name='Пользователь'
+    )
+
+    objects = ShoppingCartIngredientManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_shopping_cart_user_ingredient'
+            )
+        ]
+        verbose_name = 'Ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списка покупок'
+
+    def __str__(self):
+        return f'{self.user}: {self.amount} {self.ingredient}'
+
+
 class Tag(models.Model):
     """Модель тегов."""
 
@@ -1,6 +1,17 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from hashlib import md5
 
-from .constants import PAGE_SIZE
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from foodgram_backend.metrics import record_cache
+from .constants import CURSOR_COUNT_CACHE_TIMEOUT, PAGE_SIZE
 
 
 class RecipesUsersPagination(PageNumberPagination):
@@ -9,3 +20,185 @@ class RecipesUsersPagination(PageNumberPagination):
     page_size = PAGE_SIZE
     page_size_query_param = 'page_size'
     max_page_size = PAGE_SIZE
+
+
+class RecipesCursorPagination(BasePagination):
+    """
+    Курсорный (keyset) пагинатор: вместо OFFSET фильтрует выборку по
+    значениям полей сортировки последнего объекта страницы. Общее количество
+    объектов кэшируется, чтобы фронтенд мог показывать номера страниц.
+    """
+
+    count_cache_timeout = CURSOR_COUNT_CACHE_TIMEOUT
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+    max_page_size = PAGE_SIZE
+    ordering = ('-pub_date', '-id')
+    page_size = PAGE_SIZE
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = getattr(view, 'cursor_ordering', self.ordering)
+        self.page_size = self.get_page_size(request)
+        self.count = self.get_count(queryset)
+
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor['reverse'])
+        ordering = self.ordering
+        if reverse:
+            ordering = tuple(
+                field[1:] if field.startswith('-') else f'-{field}'
+                for field in ordering
+            )
+        queryset = queryset.order_by(*ordering)
+        if cursor:
+            queryset = queryset.filter(
+                self.get_keyset_filter(ordering, cursor['position'])
+            )
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data
+        })
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_count(self, queryset):
+        """Возвращает закэшированное количество объектов выборки."""
+
+        try:
+            query = str(queryset.query)
+        except EmptyResultSet:
+            return 0
+        key = 'cursor-count:' + md5(query.encode()).hexdigest()
+        count = cache.get(key)
+        record_cache('cursor_count', count is not None)
+        if count is None:
+            count = queryset.count()
+            cache.set(key, count, self.count_cache_timeout)
+        return count
+
+    @staticmethod
+    def get_keyset_filter(ordering, position):
+        """
+        Строит условие «строго после позиции» для составного ключа
+        сортировки: (a < a0) OR (a = a0 AND b < b0) OR ...
+        """
+
+        keyset_filter = Q()
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            keyset_filter |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return keyset_filter
+
+    def get_position(self, instance):
+        return [
+            getattr(instance, field.lstrip('-')) for field in self.ordering
+        ]
+
+    def decode_cursor(self, request, model):
+        """
+        Разбирает курсор и приводит значения позиции к типам полей
+        сортировки модели. На любой ошибке отдает 404, как курсорный
+        пагинатор DRF.
+        """
+
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode()))
+            position = cursor['position']
+            if (
+                not isinstance(cursor['reverse'], bool)
+                or not isinstance(position, list)
+                or len(position) != len(self.ordering)
+            ):
+                raise ValueError
+            cursor['position'] = [
+                self.parse_position_value(model, field, value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return cursor
+
+    @staticmethod
+    def parse_position_value(model, field, value):
+        if not isinstance(value, (str, int)) or isinstance(value, bool):
+            raise ValueError
+        value = model._meta.get_field(field.lstrip('-')).to_python(value)
+        if value is None:
+            raise ValueError
+        return value
+
+    def encode_cursor(self, position, reverse):
+        cursor = json.dumps(
+            {'position': position, 'reverse': reverse}, default=str
+        )
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            urlsafe_b64encode(cursor.encode()).decode()
+        )
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.get_position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(
+                self.request.build_absolute_uri(), self.cursor_query_param
+            )
+        return self.encode_cursor(self.get_position(self.page[0]), True)
+
+
+class CursorPaginationMixin:
+    """
+    Миксин вьюсета: включает курсорную пагинацию по параметру
+    ?pagination=cursor, по умолчанию остается постраничная.
+    """
+
+    CURSOR_PAGINATION = 'cursor'
+    PAGINATION_QUERY_PARAM = 'pagination'
+
+    cursor_pagination_class = RecipesCursorPagination
+
+    @property
+    def paginator(self):
+        if (
+            not hasattr(self, '_paginator')
+            and self.request.query_params.get(self.PAGINATION_QUERY_PARAM)
+                == self.CURSOR_PAGINATION
+        ):
+            self._paginator = self.cursor_pagination_class()
+        return super().paginator
@@ -0,0 +1,66 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListTextRenderer(BaseRenderer):
+    """Рендерер списка покупок в текстовом формате."""
+
+    charset = 'utf-8'
+    format = 'txt'
+    media_type = 'text/plain'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return '\n'.join(f'{key}: {value}' for key, value in data.items())
+        return str(data)
+
+    def stream(self, ingredients):
+        for ingredient in ingredients:
+            yield (
+                f"{ingredient['name']} {ingredient['total']} "
+                f"{ingredient['unit']}\n"
+            )
+
+
+class ShoppingListCSVRenderer(ShoppingListTextRenderer):
+    """Рендерер списка покупок в формате CSV."""
+
+    HEADER = ('name', 'amount', 'measurement_unit')
+
+    format = 'csv'
+    media_type = 'text/csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.HEADER)
+        for ingredient in ingredients:
+            yield writer.writerow(
+                (ingredient['name'], ingredient['total'], ingredient['unit'])
+            )
+
+
+class ShoppingListJSONRenderer(JSONRenderer):
+    """Рендерер списка покупок в формате JSON."""
+
+    def stream(self, ingredients):
+        separator = '['
+        for ingredient in ingredients:
+            yield separator + json.dumps(
+                {
+                    'name': ingredient['name'],
+                    'amount': ingredient['total'],
+                    'measurement_unit': ingredient['unit']
+                },
+                ensure_ascii=False
+            )
+            separator = ','
+        yield '[]' if separator == '[' else ']'
@@ -0,0 +1,101 @@
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db import connections, transaction
+from django.db.models import Exists, OuterRef, Q, Subquery, Sum
+
+from .constants import SEARCH_CONFIG, SEARCH_TERM_MAX_LENGTH
+from .models import RECIPE_SEARCH_VECTOR, RecipeSearchTerm
+
+NAME_WEIGHT = 2
+TEXT_WEIGHT = 1
+WORD = re.compile(r'\w+')
+
+
+def uses_postgres_search(using):
+    return connections[using].vendor == 'postgresql'
+
+
+def tokenize(text):
+    """Разбивает текст на слова в нижнем регистре без повторов."""
+
+    return {
+        word[:SEARCH_TERM_MAX_LENGTH]
+        for word in WORD.findall(text.lower().replace('ё', 'е'))
+    }
+
+
+def index_recipes(recipes):
+    """
+    Перестраивает записи инвертированного индекса рецептов. В PostgreSQL
+    индекс не нужен: поиск идет по GIN-индексу выражения.
+    """
+
+    recipes = list(recipes)
+    if not recipes or uses_postgres_search(recipes[0]._state.db):
+        return
+    search_terms = []
+    for recipe in recipes:
+        name_terms = tokenize(recipe.name)
+        text_terms = tokenize(recipe.text)
+        search_terms.extend(
+            RecipeSearchTerm(
+                recipe=recipe,
+                term=term,
+                weight=(
+                    NAME_WEIGHT * (term in name_terms)
+                    + TEXT_WEIGHT * (term in text_terms)
+                )
+            )
+            for term in name_terms | text_terms
+        )
+    with transaction.atomic():
+        RecipeSearchTerm.objects.filter(recipe__in=recipes).delete()
+        RecipeSearchTerm.objects.bulk_create(search_terms)
+
+
+def get_term_filter(term):
+    """Условие на слова, начинающиеся с term (диапазон по индексу)."""
+
+    return Q(term__gte=term, term__lt=term + '\uffff')
+
+
+def search_recipes(queryset, query):
+    """
+    Фильтрует рецепты по поисковому запросу и сортирует по релевантности:
+    совпадения в названии весят больше, чем в описании.
+    """
+
+    if uses_postgres_search(queryset.db):
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.annotate(
+            search_vector=RECIPE_SEARCH_VECTOR,
+            search_rank=SearchRank(RECIPE_SEARCH_VECTOR, search_query)
+        ).filter(
+            search_vector=search_query
+        ).order_by('-search_rank', '-pub_date', '-id')
+
+    terms = tokenize(query)
+    if not terms:
+        return queryset.none()
+    any_term = Q()
+    for term in terms:
+        queryset = queryset.filter(
+            Exists(
+                RecipeSearchTerm.objects.filter(
+                    get_term_filter(term), recipe=OuterRef('pk')
+                )
+            )
+        )
+        any_term |= get_term_filter(term)
+    return queryset.annotate(
+        search_rank=Subquery(
+            RecipeSearchTerm.objects.filter(
+                any_term, recipe=OuterRef('pk')
+            ).values('recipe').annotate(
+                rank=Sum('weight')
+            ).values('rank')
+        )
+    ).order_by('-search_rank', '-pub_date', '-id')
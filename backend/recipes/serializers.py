@@ -1,13 +1,19 @@
+import json
+
 import webcolors
-from drf_extra_fields.fields import Base64ImageField
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
+from django.http import QueryDict
 from rest_framework import serializers
 from rest_framework.exceptions import ValidationError
 
 from users.serializers import UserSerializer
-from .constants import (INGREDIENTS_MIN_VALUE, POSITIVE_SMALL_MAX,
-                        TIME_MIN_VALUE)
+from .constants import (BULK_RECIPES_MAX_LENGTH, INGREDIENTS_MIN_VALUE,
+                        POSITIVE_SMALL_MAX, TIME_MIN_VALUE)
+from .fields import RecipeImageField, RecipeImageUploadField
+from .images import THUMB_RENDITION
 from .models import (Favorites, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+                     RecipeTag, ShoppingCart, ShoppingCartIngredient, Tag)
 
 
 class Hex2NameColor(serializers.Field):
@@ -57,9 +63,7 @@ class AmountIngredientSerializer(serializers.ModelSerializer):
     запросов.
     """
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-    )
+    id = serializers.IntegerField()
     amount = serializers.IntegerField(
         min_value=INGREDIENTS_MIN_VALUE,
         max_value=POSITIVE_SMALL_MAX,
@@ -92,6 +96,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     EMPTY_TAGS_ERROR = 'Отсутствуют теги'
 
     author = UserSerializer(default=serializers.CurrentUserDefault())
+    image = RecipeImageField()
     ingredients = RecipeIngredientSerializer(
         source='ingredients_used',
         many=True,
@@ -106,7 +111,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         fields = (
             'id', 'author', 'name', 'text', 'image', 'ingredients', 'tags',
-            'cooking_time', 'is_favorited', 'is_in_shopping_cart'
+            'cooking_time', 'is_favorited', 'is_in_shopping_cart',
+            'favorites_count', 'shopping_cart_count'
         )
         model = Recipe
 
@@ -119,6 +125,10 @@ class RecipeCreateUpdateSerializer(RecipeSerializer):
     EMPTY_TAGS_ERROR = {'detail': 'Отсутствуют теги'}
     DOUBLE_INGREDIENT_ERROR = {'detail': 'Повтор ингредиентов'}
     DOUBLE_TAG_ERROR = {'detail': 'Повтор тегов'}
+    UNKNOWN_INGREDIENTS_ERROR = 'Ингредиенты не существуют: {}'
+    UNKNOWN_TAGS_ERROR = 'Теги не существуют: {}'
+    INVALID_JSON_ERROR = 'Ожидается список в формате JSON'
+    MULTIPART_JSON_FIELDS = ('ingredients', 'tags')
 
     author = UserSerializer(default=serializers.CurrentUserDefault())
     cooking_time = serializers.IntegerField(
@@ -130,14 +140,36 @@ class RecipeCreateUpdateSerializer(RecipeSerializer):
                          f'максимальное допустимое значение.'
         }
     )
-    image = Base64ImageField(required=True)
+    image = RecipeImageUploadField(required=True)
     ingredients = AmountIngredientSerializer(many=True)
-    tags = serializers.PrimaryKeyRelatedField(
-        many=True,
-        queryset=Tag.objects.all(),
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
         allow_empty=False,
     )
 
+    def to_internal_value(self, data):
+        if isinstance(data, QueryDict):
+            data = self.parse_multipart_data(data)
+        return super().to_internal_value(data)
+
+    def parse_multipart_data(self, data):
+        """
+        В multipart/form-data ingredients и tags передаются строкой JSON,
+        tags можно передать и повторяющимся полем.
+        """
+
+        parsed = data.dict()
+        for name in self.MULTIPART_JSON_FIELDS:
+            values = data.getlist(name)
+            if len(values) == 1 and values[0].lstrip().startswith('['):
+                try:
+                    parsed[name] = json.loads(values[0])
+                except ValueError:
+                    raise ValidationError({name: [self.INVALID_JSON_ERROR]})
+            elif values:
+                parsed[name] = values
+        return parsed
+
     def validate(self, data):
         ingredients = data.get('ingredients')
         if not ingredients:
@@ -150,6 +182,29 @@ class RecipeCreateUpdateSerializer(RecipeSerializer):
 
         return data
 
+    @staticmethod
+    def check_existing(model, ids, message):
+        """
+        Проверяет существование объектов одним запросом IN и сообщает сразу
+        обо всех несуществующих id.
+        """
+
+        unknown = set(ids) - set(
+            model.objects.filter(id__in=ids).values_list('id', flat=True)
+        )
+        if unknown:
+            raise ValidationError(
+                message.format(', '.join(map(str, sorted(unknown))))
+            )
+
+    def validate_ingredients(self, ingredients):
+        self.check_existing(
+            Ingredient,
+            [ingredient['id'] for ingredient in ingredients],
+            self.UNKNOWN_INGREDIENTS_ERROR
+        )
+        return ingredients
+
     def validate_image(self, image):
         if not image:
             raise ValidationError(self.EMPTY_IMAGE_ERROR)
@@ -163,6 +218,7 @@ class RecipeCreateUpdateSerializer(RecipeSerializer):
         if len(tags) != len(set(tags)):
             raise ValidationError(self.DOUBLE_TAG_ERROR)
 
+        self.check_existing(Tag, tags, self.UNKNOWN_TAGS_ERROR)
         return tags
 
     @staticmethod
@@ -170,12 +226,13 @@ class RecipeCreateUpdateSerializer(RecipeSerializer):
         recipe_ingredients = [
             RecipeIngredient(
                 recipe_id=recipe_id,
-                ingredient=ingredient_data['id'],
+                ingredient_id=ingredient_data['id'],
                 amount=ingredient_data['amount'])
             for ingredient_data in ingredients_data
         ]
         RecipeIngredient.objects.bulk_create(recipe_ingredients)
 
+    @transaction.atomic
     def create(self, validated_data):
         author = validated_data.pop('author')
         ingredients_data = validated_data.pop('ingredients')
@@ -185,26 +242,101 @@ class RecipeCreateUpdateSerializer(RecipeSerializer):
             recipe_id=recipe.id,
             ingredients_data=ingredients_data
         )
-
-        recipe.tags.set(tags_data)
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag_id=tag_id) for tag_id in tags_data
+        )
+        # Счетчик рецептов увеличивает сигнал, в ответе нужно новое значение.
+        author.refresh_from_db(fields=('recipes_count',))
         return recipe
 
-    def update(self, instance, validated_data):
-        instance.ingredients.clear()
-        instance.tags.clear()
-        ingredients_data = validated_data.pop('ingredients')
-        tags_data = validated_data.pop('tags')
-
-        self.ingredients_create_update_data_iteration(
-            recipe_id=instance.id,
-            ingredients_data=ingredients_data
+    @staticmethod
+    def update_ingredients(recipe, ingredients_data):
+        """
+        Приводит ингредиенты рецепта к новому составу минимальным числом
+        запросов: удаляет лишние строки, меняет количество у оставшихся и
+        добавляет новые. Возвращает прежнее и новое количество измененных и
+        добавленных ингредиентов: удаленные строки вычитает из списков
+        покупок сигнал удаления.
+        """
+
+        new_amounts = {
+            ingredient_data['id']: ingredient_data['amount']
+            for ingredient_data in ingredients_data
+        }
+        old_amounts = {}
+        kept = {}
+        removed = []
+        for recipe_ingredient in RecipeIngredient.objects.filter(
+            recipe=recipe
+        ).order_by('id'):
+            ingredient_id = recipe_ingredient.ingredient_id
+            if ingredient_id in new_amounts and ingredient_id not in kept:
+                kept[ingredient_id] = recipe_ingredient
+                old_amounts[ingredient_id] = recipe_ingredient.amount
+            else:
+                removed.append(recipe_ingredient.id)
+
+        changed = []
+        for ingredient_id, recipe_ingredient in kept.items():
+            if recipe_ingredient.amount != new_amounts[ingredient_id]:
+                recipe_ingredient.amount = new_amounts[ingredient_id]
+                changed.append(recipe_ingredient)
+
+        if removed:
+            RecipeIngredient.objects.filter(id__in=removed).delete()
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
+            )
+            for ingredient_id, amount in new_amounts.items()
+            if ingredient_id not in kept
         )
+        return old_amounts, new_amounts
 
-        instance.tags.set(tags_data)
+    @staticmethod
+    def update_tags(recipe, tags_data):
+        """Удаляет снятые теги рецепта и добавляет только новые."""
+
+        new_tags = set(tags_data)
+        old_tags = set(
+            RecipeTag.objects.filter(
+                recipe=recipe
+            ).values_list('tag_id', flat=True)
+        )
+        if old_tags - new_tags:
+            RecipeTag.objects.filter(
+                recipe=recipe, tag_id__in=old_tags - new_tags
+            ).delete()
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag_id=tag_id)
+            for tag_id in new_tags - old_tags
+        )
 
+    @transaction.atomic
+    def update(self, instance, validated_data):
+        if 'ingredients' in validated_data:
+            old_amounts, new_amounts = self.update_ingredients(
+                instance, validated_data.pop('ingredients')
+            )
+            if old_amounts != new_amounts:
+                ShoppingCartIngredient.objects.change_recipe(
+                    instance, old_amounts, new_amounts
+                )
+        if 'tags' in validated_data:
+            self.update_tags(instance, validated_data.pop('tags'))
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            'tags',
+            Prefetch(
+                'ingredients_used',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
         return RecipeSerializer(
             instance,
             context=self.context
@@ -213,7 +345,7 @@ class RecipeCreateUpdateSerializer(RecipeSerializer):
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
 
-    image = serializers.ImageField(read_only=True)
+    image = RecipeImageField(rendition=THUMB_RENDITION)
 
     class Meta:
         fields = ('id', 'name', 'image', 'cooking_time')
@@ -223,15 +355,6 @@ class ShortRecipeSerializer(serializers.ModelSerializer):
 class FavShopSerializer(serializers.ModelSerializer):
     """Родительский сериализатор для избранного и списка покупок."""
 
-    ALREADY_EXIST_ERROR = {'detail': 'Рецепт уже находится в списке'}
-
-    def validate(self, data):
-        model = getattr(self.Meta, 'model', None)
-        if model:
-            if model.objects.filter(**data).exists():
-                raise ValidationError(self.ALREADY_EXIST_ERROR)
-        return data
-
     def to_representation(self, instance):
         return ShortRecipeSerializer(
             instance.recipe,
@@ -253,3 +376,16 @@ class ShoppingCartSerializer(FavShopSerializer):
     class Meta:
         fields = ('recipe', 'user')
         model = ShoppingCart
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Сериализатор списка id рецептов для массовых операций."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BULK_RECIPES_MAX_LENGTH
+    )
+
+    def validate_recipes(self, recipes):
+        return list(dict.fromkeys(recipes))
@@ -0,0 +1,201 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from users.models import User, update_counter
+from .data_versions import INGREDIENTS_DATA, TAGS_DATA, bump_data_version
+from .models import (Favorites, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, ShoppingCartIngredient, Tag)
+from .search import index_recipes, uses_postgres_search
+from .tasks import make_recipe_renditions
+
+
+def get_origin_model(origin):
+    """Модель объекта или выборки, с удаления которых начался каскад."""
+
+    return origin.model if isinstance(origin, QuerySet) else type(origin)
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    bump_data_version(INGREDIENTS_DATA)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    bump_data_version(TAGS_DATA)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(instance, **kwargs):
+    """
+    Ставит в очередь создание копий изображения после фиксации транзакции,
+    если копии еще не построены для текущего файла.
+    """
+
+    if (
+        instance.image
+        and instance.image_renditions.get('source') != instance.image.name
+    ):
+        transaction.on_commit(
+            lambda: make_recipe_renditions.delay(instance.id)
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_text_changed(instance, using, update_fields, **kwargs):
+    """
+    Перестраивает поисковый индекс рецепта после фиксации транзакции при
+    любом сохранении через ORM: в API, админке и shell. В PostgreSQL поиск
+    идет по индексу выражения и обновлять нечего.
+    """
+
+    if uses_postgres_search(using) or (
+        update_fields is not None
+        and not {'name', 'text'} & set(update_fields)
+    ):
+        return
+    transaction.on_commit(lambda: index_recipes([instance]), using=using)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(instance, created, **kwargs):
+    if created:
+        update_counter(
+            User.objects.filter(id=instance.author_id), 'recipes_count', 1
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(instance, origin, **kwargs):
+    """
+    Вычитает ингредиенты рецепта из всех списков покупок, в которых он
+    есть, и уменьшает счетчик рецептов автора. Сигнал отправляется до
+    удаления связанных строк при удалении через API и в админке. Рецепты
+    удаляемого автора обрабатывает user_deleted одним запросом.
+    """
+
+    if get_origin_model(origin) is User:
+        return
+    ShoppingCartIngredient.objects.remove_deleted_recipes([instance.id])
+    update_counter(
+        User.objects.filter(id=instance.author_id), 'recipes_count', -1
+    )
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def recipe_ingredient_changing(instance, **kwargs):
+    instance._previous = RecipeIngredient.objects.filter(
+        pk=instance.pk
+    ).values_list(
+        'recipe_id', 'ingredient_id', 'amount'
+    ).first() if instance.pk else None
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_changed(instance, **kwargs):
+    """
+    Переносит в списки покупок строки ингредиентов, созданные или
+    измененные через ORM (в админке, из shell). Сериализатор рецепта пишет
+    строки через bulk_create и bulk_update без сигналов и обновляет списки
+    сам.
+    """
+
+    previous = instance._previous
+    current = (instance.recipe_id, instance.ingredient_id, instance.amount)
+    if previous == current:
+        return
+    if previous:
+        recipe_id, ingredient_id, amount = previous
+        ShoppingCartIngredient.objects.change_recipe(
+            recipe_id, {ingredient_id: amount}, {}
+        )
+    ShoppingCartIngredient.objects.change_recipe(
+        instance.recipe_id, {}, {instance.ingredient_id: instance.amount}
+    )
+
+
+@receiver(pre_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(instance, origin, **kwargs):
+    """
+    Вычитает удаляемые строки ингредиентов из списков покупок. При удалении
+    выборки все ее строки вычитаются одним запросом при первом сигнале, а
+    при удалении рецепта или автора списки обновляют их обработчики.
+    """
+
+    if get_origin_model(origin) is not RecipeIngredient:
+        return
+    if isinstance(origin, QuerySet):
+        if getattr(origin, '_shopping_carts_updated', False):
+            return
+        origin._shopping_carts_updated = True
+        recipe_ingredients = origin
+    else:
+        recipe_ingredients = RecipeIngredient.objects.filter(pk=instance.pk)
+    ShoppingCartIngredient.objects.remove_recipe_ingredients(
+        recipe_ingredients
+    )
+
+
+@receiver(pre_save, sender=Favorites)
+@receiver(pre_save, sender=ShoppingCart)
+def recipe_user_changing(sender, instance, **kwargs):
+    instance._previous = sender.objects.filter(
+        pk=instance.pk
+    ).values_list('user_id', 'recipe_id').first() if instance.pk else None
+
+
+@receiver(post_save, sender=Favorites)
+@receiver(post_save, sender=ShoppingCart)
+def recipe_user_changed(sender, instance, **kwargs):
+    """
+    Обновляет счетчики рецептов и агрегат списка покупок для строк
+    избранного и списка покупок, созданных или измененных через ORM
+    (например, в админке). API пишет в таблицы запросами RecipeUserManager
+    без сигналов и обновляет зависимые данные сам.
+    """
+
+    if instance._previous == (instance.user_id, instance.recipe_id):
+        return
+    if instance._previous:
+        user_id, recipe_id = instance._previous
+        sender.objects.recipes_removed(user_id, [recipe_id])
+    sender.objects.recipes_added(instance.user_id, [instance.recipe_id])
+
+
+@receiver(pre_delete, sender=Favorites)
+@receiver(pre_delete, sender=ShoppingCart)
+def recipe_user_deleted(sender, instance, origin, **kwargs):
+    """
+    При удалении строк избранного и списка покупок обновляет счетчики
+    рецептов и агрегат. При каскадном удалении рецепта он удаляется вместе
+    со счетчиками, а при удалении пользователя данные обновляет
+    user_deleted.
+    """
+
+    if get_origin_model(origin) is sender:
+        sender.objects.recipes_removed(instance.user_id, [instance.recipe_id])
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(instance, **kwargs):
+    """
+    Уменьшает счетчики избранного и списков покупок у рецептов из списков
+    удаляемого пользователя и вычитает его рецепты из чужих списков
+    покупок. Агрегат его собственного списка удаляется каскадом.
+    """
+
+    ShoppingCartIngredient.objects.remove_deleted_recipes(
+        Recipe.objects.filter(author=instance).values('id')
+    )
+    for model in (Favorites, ShoppingCart):
+        model.objects.update_counter(
+            list(
+                model.objects.filter(user=instance).values_list(
+                    'recipe_id', flat=True
+                )
+            ),
+            -1
+        )
@@ -0,0 +1,40 @@
+import os
+from hashlib import sha256
+
+from django.core.files.storage import FileSystemStorage
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла — sha256 его содержимого:
+    images/ab/cd/<sha256>.<ext>. Одинаковые загрузки сохраняются один раз и
+    разделяют файл, поэтому удалять файлы можно только после проверки
+    ссылок на них (см. команду cleanup_images).
+    """
+
+    @staticmethod
+    def get_content_hash(content):
+        digest = sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        return digest.hexdigest()
+
+    def save(self, name, content, max_length=None):
+        directory, filename = os.path.split(name)
+        content_hash = self.get_content_hash(content)
+        name = os.path.join(
+            directory,
+            content_hash[:2],
+            content_hash[2:4],
+            content_hash + os.path.splitext(filename)[1].lower()
+        )
+        if self.exists(name):
+            # Обновляем время изменения: файл снова используется и не должен
+            # попасть под очистку в течение льготного периода.
+            try:
+                os.utime(self.path(name))
+                return name
+            except FileNotFoundError:
+                # cleanup_images удалил файл после проверки: сохраняем заново.
+                pass
+        return super().save(name, content, max_length)
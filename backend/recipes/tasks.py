@@ -0,0 +1,17 @@
+from celery import shared_task
+
+from .images import build_renditions
+from .models import Recipe
+
+
+@shared_task
+def make_recipe_renditions(recipe_id):
+    """Создает копии изображения рецепта для карточек, страницы и превью."""
+
+    recipe = Recipe.objects.filter(pk=recipe_id).only('image').first()
+    if recipe is None or not recipe.image:
+        return
+    renditions = build_renditions(recipe.image)
+    Recipe.objects.filter(
+        pk=recipe_id, image=recipe.image.name
+    ).update(image_renditions=renditions)
@@ -0,0 +1,112 @@
+import tempfile
+from base64 import b64encode
+from collections import namedtuple
+from io import BytesIO
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test.utils import override_settings
+from PIL import Image
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (Favorites, Ingredient, Recipe, RecipeIngredient,
+                            RecipeTag, ShoppingCart, ShoppingCartIngredient,
+                            Tag)
+from users.models import Subscribe, User
+
+PASSWORD = 'test-password-1'
+
+Fixtures = namedtuple(
+    'Fixtures',
+    ('user', 'token', 'authors', 'recipes', 'own_recipe', 'fresh_recipe',
+     'fresh_author', 'tags', 'ingredients', 'image')
+)
+
+
+class TemporaryFilesMixin:
+    """
+    Миксин теста: медиафайлы и общий файловый кэш (версии справочников,
+    индекс ингредиентов) пишутся во временный каталог, кэш Django
+    очищается перед каждым тестом.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        files_settings = override_settings(
+            MEDIA_ROOT=directory.name, SHARED_CACHE_DIR=directory.name
+        )
+        files_settings.enable()
+        cls.addClassCleanup(files_settings.disable)
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+def get_image():
+    buffer = BytesIO()
+    Image.new('RGB', (4, 4), (230, 160, 90)).save(buffer, 'PNG')
+    return 'data:image/png;base64,' + b64encode(buffer.getvalue()).decode()
+
+
+def build_fixtures(size, image=None):
+    """
+    Создает по size ингредиентов, тегов, пользователей и рецептов со всеми
+    ингредиентами и тегами. У первого пользователя все чужие рецепты в
+    избранном и списке покупок и подписки на всех авторов. Малый размер
+    должен быть меньше страницы пагинации, иначе рост числа запросов на
+    списках не будет заметен.
+    """
+
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+        for number in range(size)
+    )
+    Tag.objects.bulk_create(
+        Tag(name=f'тег {number}', slug=f'tag-{number}',
+            color=f'#{number:06X}')
+        for number in range(size)
+    )
+    password = make_password(PASSWORD)
+    User.objects.bulk_create(
+        User(username=f'user_{number}', email=f'user_{number}@example.com',
+             first_name='Имя', last_name='Фамилия', password=password)
+        for number in range(size)
+    )
+    authors = list(User.objects.order_by('id'))
+    user, fresh_author, authors = authors[0], authors[1], authors[2:]
+    Recipe.objects.bulk_create(
+        Recipe(author=author, name=f'Рецепт {number}', text='Описание',
+               cooking_time=10, image='images/test.png')
+        for number, author in enumerate([user, user] + authors)
+    )
+    recipes = list(Recipe.objects.order_by('id').values_list('id', flat=True))
+    ingredients = list(
+        Ingredient.objects.order_by('id').values_list('id', flat=True)
+    )
+    tags = list(Tag.objects.order_by('id').values_list('id', flat=True))
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe_id=recipe, ingredient_id=pk, amount=10)
+        for recipe in recipes for pk in ingredients
+    )
+    RecipeTag.objects.bulk_create(
+        RecipeTag(recipe_id=recipe, tag_id=pk)
+        for recipe in recipes for pk in tags
+    )
+    own_recipe, fresh_recipe, recipes = recipes[0], recipes[1], recipes[2:]
+    for model in (Favorites, ShoppingCart):
+        model.objects.bulk_create(
+            model(user=user, recipe_id=recipe) for recipe in recipes
+        )
+    ShoppingCartIngredient.objects.rebuild([user.id])
+    Subscribe.objects.bulk_create(
+        Subscribe(subscriber=user, author=author) for author in authors
+    )
+    return Fixtures(
+        user, Token.objects.create(user=user).key,
+        [author.id for author in authors], recipes, own_recipe, fresh_recipe,
+        fresh_author.id, tags, ingredients, image
+    )
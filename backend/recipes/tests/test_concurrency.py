@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+from unittest import SkipTest
+
+from django.db import connection
+from django.test import TransactionTestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (Favorites, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingCartIngredient)
+from users.models import Subscribe, User
+from .fixtures import PASSWORD, TemporaryFilesMixin
+
+THREADS = 8
+ADD_STATUSES = {201, 400}
+REMOVE_STATUSES = {204, 404}
+
+
+class ParallelRequestsTests(TemporaryFilesMixin, TransactionTestCase):
+    """
+    Параллельные добавления и удаления в избранном, списке покупок и
+    подписках не приводят к ошибкам сервера, дублям строк и расхождению
+    счетчиков.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            raise SkipTest(
+                'Тестовая база SQLite в памяти блокирует параллельную запись'
+            )
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        self.user, self.author = (
+            User.objects.create_user(
+                username=name, email=f'{name}@example.com',
+                first_name='Имя', last_name='Фамилия', password=PASSWORD
+            )
+            for name in ('user', 'author')
+        )
+        self.token = Token.objects.create(user=self.user).key
+        # bulk_create не отправляет post_save, поэтому копии изображения
+        # несуществующего файла не строятся.
+        self.recipe, = Recipe.objects.bulk_create([
+            Recipe(author=self.author, name='Рецепт', text='Описание',
+                   cooking_time=10, image='images/test.png')
+        ])
+        RecipeIngredient.objects.create(
+            recipe=self.recipe,
+            ingredient=Ingredient.objects.create(
+                name='ингредиент', measurement_unit='г'
+            ),
+            amount=10
+        )
+
+    def get_cases(self):
+        """Адрес, строки пользователя и счетчик для каждого списка."""
+
+        recipe = {'pk': self.recipe.id}
+        recipes = Recipe.objects.filter(id=self.recipe.id)
+        return {
+            'favorite': (
+                reverse('recipes:recipes-favorite', kwargs=recipe),
+                Favorites.objects.filter(user=self.user),
+                recipes.values_list('favorites_count', flat=True)
+            ),
+            'shopping_cart': (
+                reverse('recipes:recipes-shopping-cart', kwargs=recipe),
+                ShoppingCart.objects.filter(user=self.user),
+                recipes.values_list('shopping_cart_count', flat=True)
+            ),
+            'subscribe': (
+                reverse(
+                    'users:users-subscribe', kwargs={'id': self.author.id}
+                ),
+                Subscribe.objects.filter(subscriber=self.user),
+                User.objects.filter(id=self.author.id).values_list(
+                    'followers_count', flat=True
+                )
+            )
+        }
+
+    def send(self, barrier, method, url):
+        client = APIClient(raise_request_exception=False)
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        try:
+            barrier.wait()
+            return getattr(client, method)(url).status_code
+        finally:
+            connection.close()
+
+    def send_parallel(self, methods, url):
+        barrier = Barrier(len(methods))
+        with ThreadPoolExecutor(len(methods)) as executor:
+            futures = [
+                executor.submit(self.send, barrier, method, url)
+                for method in methods
+            ]
+            return [future.result() for future in futures]
+
+    def assert_consistent(self, rows, counter):
+        self.assertLessEqual(rows.count(), 1)
+        self.assertEqual(counter.get(), rows.count())
+        self.assertEqual(
+            ShoppingCartIngredient.objects.get_stored_amounts([self.user.id]),
+            ShoppingCartIngredient.objects.get_actual_amounts([self.user.id])
+        )
+
+    def test_parallel_add_and_remove(self):
+        for name, (url, rows, counter) in self.get_cases().items():
+            with self.subTest(name):
+                statuses = self.send_parallel(['post'] * THREADS, url)
+                self.assertEqual(
+                    sorted(statuses), [201] + [400] * (THREADS - 1)
+                )
+                self.assertEqual(rows.count(), 1)
+                self.assert_consistent(rows, counter)
+
+                statuses = self.send_parallel(['delete'] * THREADS, url)
+                self.assertEqual(
+                    sorted(statuses), [204] + [404] * (THREADS - 1)
+                )
+                self.assertEqual(rows.count(), 0)
+                self.assert_consistent(rows, counter)
+
+                statuses = self.send_parallel(
+                    ['post', 'delete'] * (THREADS // 2), url
+                )
+                self.assertLessEqual(
+                    set(statuses), ADD_STATUSES | REMOVE_STATUSES
+                )
+                self.assert_consistent(rows, counter)
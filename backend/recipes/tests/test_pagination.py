@@ -0,0 +1,59 @@
+import json
+from base64 import urlsafe_b64encode
+
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .fixtures import TemporaryFilesMixin, build_fixtures
+
+TAMPERED_CURSORS = (
+    'не-base64',
+    [],
+    {'position': ['2020-01-01T00:00:00+00:00', 1]},
+    {'position': ['2020-01-01T00:00:00+00:00', 1], 'reverse': 'false'},
+    {'position': ['2020-01-01T00:00:00+00:00'], 'reverse': False},
+    {'position': 'ab', 'reverse': False},
+    {'position': ['не дата', 1], 'reverse': False},
+    {'position': [None, 1], 'reverse': False},
+    {'position': ['2020-01-01T00:00:00+00:00', 'x'], 'reverse': False},
+    {'position': [{}, 1], 'reverse': False},
+)
+
+
+def encode(cursor):
+    if isinstance(cursor, str):
+        return cursor
+    return urlsafe_b64encode(json.dumps(cursor).encode()).decode()
+
+
+class CursorPaginationTests(TemporaryFilesMixin, TestCase):
+    """Курсорная пагинация отвечает 404 на подделанный курсор."""
+
+    @classmethod
+    def setUpTestData(cls):
+        build_fixtures(5)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.url = reverse('recipes:recipes-list')
+
+    def get(self, url=None, **params):
+        return self.client.get(
+            url or self.url,
+            {'pagination': 'cursor', 'page_size': 2, **params}
+        )
+
+    def test_next_link(self):
+        for url in (self.url, reverse('users:users-list')):
+            with self.subTest(url=url):
+                response = self.client.get(self.get(url).data['next'])
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), 2)
+
+    def test_tampered_cursor(self):
+        for cursor in TAMPERED_CURSORS:
+            with self.subTest(cursor=cursor):
+                response = self.get(cursor=encode(cursor))
+                self.assertEqual(response.status_code, 404)
@@ -0,0 +1,289 @@
+import difflib
+import re
+import tempfile
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLResolver, reverse
+from rest_framework.test import APIClient
+
+import recipes.urls
+import users.urls
+from .fixtures import PASSWORD, build_fixtures, get_image
+
+HTTP_METHODS = ('get', 'post', 'put', 'patch', 'delete')
+SIZES = (5, 50)
+SAVEPOINT_RE = re.compile(r'^(RELEASE |ROLLBACK TO )?SAVEPOINT ', re.I)
+LITERAL_RE = re.compile(r"'[^']*'|\b\d+\b")
+PARAMETERS_RE = re.compile(r'\((?:\?, )*\?\)')
+
+Case = namedtuple(
+    'Case', ('route', 'method', 'budget', 'kwargs', 'data', 'query'),
+    defaults=(None, None, '')
+)
+
+
+def own_recipe(fixtures):
+    return {'pk': fixtures.own_recipe}
+
+
+def fresh_recipe(fixtures):
+    return {'pk': fixtures.fresh_recipe}
+
+
+def listed_recipe(fixtures):
+    return {'pk': fixtures.recipes[-1]}
+
+
+def current_user(fixtures):
+    return {'id': fixtures.user.id}
+
+
+def author(fixtures):
+    return {'id': fixtures.authors[-1]}
+
+
+def fresh_author(fixtures):
+    return {'id': fixtures.fresh_author}
+
+
+def tag(fixtures):
+    return {'pk': fixtures.tags[-1]}
+
+
+def ingredient(fixtures):
+    return {'pk': fixtures.ingredients[-1]}
+
+
+def recipe_data(fixtures):
+    return {
+        'ingredients': [
+            {'id': pk, 'amount': 10} for pk in fixtures.ingredients
+        ],
+        'tags': fixtures.tags,
+        'image': fixtures.image,
+        'name': 'Новый рецепт',
+        'text': 'Описание',
+        'cooking_time': 10
+    }
+
+
+def recipe_ids(fixtures):
+    return {'recipes': fixtures.recipes}
+
+
+def new_user(fixtures):
+    return {
+        'email': 'new@example.com', 'username': 'new_user',
+        'first_name': 'Имя', 'last_name': 'Фамилия',
+        'password': PASSWORD
+    }
+
+
+def user_update(fixtures):
+    return {'first_name': 'Другое имя'}
+
+
+def current_password(fixtures):
+    return {'current_password': PASSWORD}
+
+
+def login(fixtures):
+    return {'email': fixtures.user.email, 'password': PASSWORD}
+
+
+def set_password(fixtures):
+    return {'current_password': PASSWORD, 'new_password': 'test-password-2'}
+
+
+def set_email(fixtures):
+    return {'current_password': PASSWORD, 'new_email': 'other@example.com'}
+
+
+def email(fixtures):
+    return {'email': fixtures.user.email}
+
+
+def invalid_token(fixtures):
+    return {
+        'uid': 'x', 'token': 'x', 'new_password': 'test-password-2',
+        'new_email': 'other@example.com'
+    }
+
+
+# Бюджет — максимально допустимое число SQL-запросов на один запрос к API.
+# Число запросов также не должно зависеть от размера данных.
+QUERY_BUDGETS = (
+    Case('recipes:api-root', 'get', 1),
+    Case('recipes:ingredients-list', 'get', 2),
+    Case('recipes:ingredients-list', 'get', 2, query='?name=ингр'),
+    Case('recipes:ingredients-detail', 'get', 2, ingredient),
+    Case('recipes:tags-list', 'get', 2),
+    Case('recipes:tags-detail', 'get', 2, tag),
+    Case('recipes:recipes-list', 'get', 7),
+    Case('recipes:recipes-list', 'get', 7, query='?pagination=cursor'),
+    Case('recipes:recipes-list', 'post', 11, data=recipe_data),
+    Case('recipes:recipes-detail', 'get', 6, own_recipe),
+    Case('recipes:recipes-detail', 'put', 14, own_recipe, recipe_data),
+    Case('recipes:recipes-detail', 'patch', 13, own_recipe, recipe_data),
+    Case('recipes:recipes-detail', 'delete', 15, own_recipe),
+    Case('recipes:recipes-download-shopping-cart', 'get', 2),
+    Case('recipes:recipes-favorite', 'post', 4, fresh_recipe),
+    Case('recipes:recipes-favorite', 'patch', 4, fresh_recipe),
+    Case('recipes:recipes-favorite', 'delete', 3, listed_recipe),
+    Case('recipes:recipes-favorite-bulk', 'post', 3, data=recipe_ids),
+    Case('recipes:recipes-favorite-bulk', 'delete', 4, data=recipe_ids),
+    Case('recipes:recipes-shopping-cart', 'post', 8, fresh_recipe),
+    Case('recipes:recipes-shopping-cart', 'delete', 7, listed_recipe),
+    Case('recipes:recipes-shopping-cart-bulk', 'post', 3, data=recipe_ids),
+    Case('recipes:recipes-shopping-cart-bulk', 'delete', 8, data=recipe_ids),
+    Case('users:api-root', 'get', 1),
+    Case('users:users-list', 'get', 3),
+    Case('users:users-list', 'get', 3, query='?pagination=cursor'),
+    Case('users:users-list', 'post', 4, data=new_user),
+    Case('users:users-detail', 'get', 2, author),
+    Case('users:users-detail', 'put', 5, current_user, new_user),
+    Case('users:users-detail', 'patch', 3, current_user, user_update),
+    Case('users:users-detail', 'delete', 30, current_user, current_password),
+    Case('users:users-me', 'get', 1),
+    Case('users:users-me', 'put', 3, data=new_user),
+    Case('users:users-me', 'patch', 2, data=user_update),
+    Case('users:users-me', 'delete', 29, data=current_password),
+    Case('users:users-subscriptions', 'get', 4),
+    Case('users:users-subscribe', 'post', 5, fresh_author),
+    Case('users:users-subscribe', 'delete', 3, author),
+    Case('users:users-set-password', 'post', 2, data=set_password),
+    Case('users:users-set-username', 'post', 3, data=set_email),
+    Case('users:users-activation', 'post', 1, data=invalid_token),
+    Case('users:users-resend-activation', 'post', 2, data=email),
+    Case('users:users-reset-password', 'post', 2, data=email),
+    Case('users:users-reset-password-confirm', 'post', 1, data=invalid_token),
+    Case('users:users-reset-username', 'post', 2, data=email),
+    Case('users:users-reset-username-confirm', 'post', 2, data=invalid_token),
+    Case('users:login', 'post', 4, data=login),
+    Case('users:logout', 'post', 2),
+)
+
+
+def get_routes():
+    """Возвращает пары (маршрут, метод) всех эндпоинтов приложений."""
+
+    routes = set()
+    for module in (recipes.urls, users.urls):
+        patterns = list(module.urlpatterns)
+        while patterns:
+            pattern = patterns.pop()
+            if isinstance(pattern, URLResolver):
+                patterns.extend(pattern.url_patterns)
+                continue
+            actions = getattr(pattern.callback, 'actions', None)
+            if actions is None:
+                actions = {
+                    method: method for method in HTTP_METHODS
+                    if hasattr(pattern.callback.cls, method)
+                }
+            routes.update(
+                (f'{module.app_name}:{pattern.name}', method)
+                for method in actions if method in HTTP_METHODS
+            )
+    return routes
+
+
+def normalize(sql):
+    """Заменяет значения параметров, чтобы сравнивать только форму запросов."""
+
+    return PARAMETERS_RE.sub('(...)', LITERAL_RE.sub('?', sql))
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Число SQL-запросов каждого эндпоинта не превышает бюджета и не растет
+    вместе с объемом данных.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.image = get_image()
+
+    def measure(self, case, fixtures):
+        """Выполняет запрос и откатывает все его изменения."""
+
+        with transaction.atomic(), tempfile.TemporaryDirectory() as directory:
+            with override_settings(
+                SHARED_CACHE_DIR=directory, MEDIA_ROOT=directory
+            ):
+                cache.clear()
+                client = APIClient(raise_request_exception=False)
+                client.credentials(
+                    HTTP_AUTHORIZATION=f'Token {fixtures.token}'
+                )
+                url = reverse(
+                    case.route,
+                    kwargs=case.kwargs(fixtures) if case.kwargs else None
+                ) + case.query
+                data = case.data(fixtures) if case.data else None
+                with CaptureQueriesContext(connection) as context:
+                    response = getattr(client, case.method)(
+                        url, data, format='json'
+                    )
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        queries = [
+            query['sql'] for query in context.captured_queries
+            if not SAVEPOINT_RE.match(query['sql'])
+        ]
+        return response.status_code, queries
+
+    def measure_all(self, size):
+        """Выполняет все запросы на одном наборе данных размера size."""
+
+        with transaction.atomic():
+            try:
+                fixtures = build_fixtures(size, self.image)
+                return [self.measure(case, fixtures) for case in QUERY_BUDGETS]
+            finally:
+                transaction.set_rollback(True)
+
+    def test_all_routes_have_budget(self):
+        missing = get_routes() - {
+            (case.route, case.method) for case in QUERY_BUDGETS
+        }
+        self.assertFalse(
+            missing,
+            'Нет бюджета для ' + ', '.join(
+                f'{method.upper()} {route}'
+                for route, method in sorted(missing)
+            )
+        )
+
+    def test_query_budgets(self):
+        for case, (_, small), (status, large) in zip(
+            QUERY_BUDGETS, *(self.measure_all(size) for size in SIZES)
+        ):
+            with self.subTest(
+                f'{case.method.upper()} {case.route}{case.query}'
+            ):
+                self.assertLess(status, 500, 'Ошибка сервера')
+                self.assertEqual(
+                    len(small), len(large),
+                    'Число запросов зависит от размера данных:\n' + '\n'.join(
+                        difflib.unified_diff(
+                            [normalize(sql) for sql in small],
+                            [normalize(sql) for sql in large],
+                            f'size={SIZES[0]}', f'size={SIZES[1]}',
+                            lineterm=''
+                        )
+                    )
+                )
+                self.assertLessEqual(
+                    len(large), case.budget,
+                    'Превышен бюджет:\n' + '\n'.join(
+                        f'{number}. {sql}'
+                        for number, sql in enumerate(large, 1)
+                    )
+                )
@@ -0,0 +1,81 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+from .fixtures import TemporaryFilesMixin, get_image
+
+INGREDIENTS_COUNT = 50
+# Поисковый индекс строится после фиксации транзакции и здесь не учтен.
+CREATE_QUERIES = 13
+
+
+class RecipeCreateTests(TemporaryFilesMixin, TestCase):
+    """
+    Ингредиенты и теги рецепта проверяются одним запросом на модель, число
+    запросов создания не зависит от их количества.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = [
+            ingredient.id for ingredient in Ingredient.objects.bulk_create(
+                Ingredient(name=f'ингредиент {number}', measurement_unit='г')
+                for number in range(INGREDIENTS_COUNT)
+            )
+        ]
+        cls.tags = [
+            tag.id for tag in Tag.objects.bulk_create(
+                Tag(name=f'тег {number}', slug=f'tag-{number}',
+                    color=f'#{number:06X}')
+                for number in range(3)
+            )
+        ]
+        cls.user = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Имя', last_name='Фамилия', password='password-1'
+        )
+        cls.token = Token.objects.create(user=cls.user).key
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    def create(self, ingredients):
+        return self.client.post(
+            reverse('recipes:recipes-list'),
+            {
+                'ingredients': [
+                    {'id': pk, 'amount': 10} for pk in ingredients
+                ],
+                'tags': self.tags,
+                'image': get_image(),
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 10
+            },
+            format='json'
+        )
+
+    def test_create_query_count(self):
+        for count in (1, INGREDIENTS_COUNT):
+            with self.subTest(ingredients=count):
+                with self.assertNumQueries(CREATE_QUERIES):
+                    response = self.create(self.ingredients[:count])
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(len(response.data['ingredients']), count)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 2)
+
+    def test_unknown_ingredients_reported_at_once(self):
+        unknown = [max(self.ingredients) + 1, max(self.ingredients) + 2]
+        with self.assertNumQueries(3):
+            response = self.create(self.ingredients[:1] + unknown)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(
+            ', '.join(map(str, unknown)), str(response.data['ingredients'])
+        )
+        self.assertFalse(Recipe.objects.exists())
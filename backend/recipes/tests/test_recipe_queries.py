@@ -0,0 +1,65 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from recipes.constants import PAGE_SIZE
+from .fixtures import TemporaryFilesMixin, build_fixtures
+
+LIST_QUERIES = {'anonymous': 4, 'authenticated': 6}
+DETAIL_QUERIES = {'anonymous': 3, 'authenticated': 5}
+
+
+class RecipeQueryCountTests(TemporaryFilesMixin, TestCase):
+    """
+    Число запросов списка и страницы рецепта не зависит от размера
+    страницы и числа ингредиентов, тегов и подписок.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = build_fixtures(PAGE_SIZE * 2)
+
+    def get_clients(self):
+        authenticated = APIClient()
+        authenticated.credentials(
+            HTTP_AUTHORIZATION=f'Token {self.fixtures.token}'
+        )
+        return {'anonymous': APIClient(), 'authenticated': authenticated}
+
+    def get(self, client, url, queries):
+        # Первый запрос заполняет кэши процесса (справочник тегов фильтра).
+        client.get(url)
+        with self.assertNumQueries(queries):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_list(self):
+        for name, client in self.get_clients().items():
+            for page_size in (1, PAGE_SIZE):
+                with self.subTest(name, page_size=page_size):
+                    response = self.get(
+                        client,
+                        f'{reverse("recipes:recipes-list")}'
+                        f'?page_size={page_size}',
+                        LIST_QUERIES[name]
+                    )
+                    self.assertEqual(
+                        len(response.data['results']), page_size
+                    )
+
+    def test_detail(self):
+        for name, client in self.get_clients().items():
+            with self.subTest(name):
+                response = self.get(
+                    client,
+                    reverse(
+                        'recipes:recipes-detail',
+                        kwargs={'pk': self.fixtures.recipes[-1]}
+                    ),
+                    DETAIL_QUERIES[name]
+                )
+                self.assertEqual(
+                    len(response.data['ingredients']),
+                    len(self.fixtures.ingredients)
+                )
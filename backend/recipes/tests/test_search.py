@@ -0,0 +1,34 @@
+from django.test import TestCase
+
+from recipes.models import Recipe
+from recipes.search import search_recipes
+from users.models import User
+
+
+class RecipeSearchIndexTests(TestCase):
+    """Рецепт, сохраненный через ORM, находится поиском."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com',
+            first_name='Имя', last_name='Фамилия'
+        )
+
+    def search(self, query):
+        return list(search_recipes(Recipe.objects.all(), query))
+
+    def test_orm_create_and_update(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.author, name='Борщ', text='Свекла и капуста',
+                cooking_time=60
+            )
+        self.assertEqual(self.search('борщ'), [recipe])
+        self.assertEqual(self.search('капуста'), [recipe])
+
+        recipe.name = 'Щи'
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe.save()
+        self.assertEqual(self.search('борщ'), [])
+        self.assertEqual(self.search('щи'), [recipe])
@@ -0,0 +1,36 @@
+import re
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from .fixtures import TemporaryFilesMixin, build_fixtures
+
+SERIALIZE_RE = re.compile(r'\bserialize;dur=([\d.]+)')
+
+
+@override_settings(SERVER_TIMING=True)
+class ServerTimingTests(TemporaryFilesMixin, TestCase):
+    """Время сериализации ответа попадает в заголовок Server-Timing."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = build_fixtures(5)
+
+    def test_serialize_duration(self):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Token {self.fixtures.token}')
+        for url in (
+            reverse('recipes:recipes-list'),
+            reverse('recipes:recipes-detail',
+                    kwargs={'pk': self.fixtures.recipes[0]}),
+            reverse('users:users-list'),
+            reverse('users:users-me'),
+            reverse('users:users-subscriptions'),
+        ):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                duration = SERIALIZE_RE.search(response['Server-Timing'])
+                self.assertIsNotNone(duration)
+                self.assertGreater(float(duration.group(1)), 0)
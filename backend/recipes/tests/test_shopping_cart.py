@@ -0,0 +1,90 @@
+from django.test import TestCase
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingCartIngredient)
+from users.models import User
+from .fixtures import TemporaryFilesMixin, build_fixtures, get_image
+
+
+class ShoppingCartAggregateTests(TemporaryFilesMixin, TestCase):
+    """
+    Агрегат списка покупок совпадает с пересчетом по содержимому корзин
+    после изменения ингредиентов рецептов любым способом.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.fixtures = build_fixtures(5)
+        cls.user = cls.fixtures.user
+        cls.recipe = Recipe.objects.get(pk=cls.fixtures.recipes[0])
+
+    def assert_aggregate_actual(self):
+        manager = ShoppingCartIngredient.objects
+        self.assertEqual(
+            manager.get_stored_amounts([self.user.id]),
+            manager.get_actual_amounts([self.user.id])
+        )
+
+    def test_queryset_delete(self):
+        RecipeIngredient.objects.filter(
+            recipe__in=self.fixtures.recipes[:2],
+            ingredient__in=self.fixtures.ingredients[:2]
+        ).delete()
+        self.assert_aggregate_actual()
+
+    def test_instance_delete(self):
+        RecipeIngredient.objects.filter(recipe=self.recipe).first().delete()
+        self.assert_aggregate_actual()
+
+    def test_create_and_update(self):
+        recipe_ingredient = RecipeIngredient.objects.create(
+            recipe=self.recipe,
+            ingredient=Ingredient.objects.create(
+                name='новый ингредиент', measurement_unit='г'
+            ),
+            amount=3
+        )
+        self.assert_aggregate_actual()
+        recipe_ingredient.amount = 7
+        recipe_ingredient.save()
+        self.assert_aggregate_actual()
+        recipe_ingredient.recipe_id = self.fixtures.own_recipe
+        recipe_ingredient.save()
+        self.assert_aggregate_actual()
+
+    def test_recipe_update_through_api(self):
+        client = APIClient()
+        client.force_authenticate(self.recipe.author)
+        response = client.patch(
+            reverse('recipes:recipes-detail', kwargs={'pk': self.recipe.id}),
+            {
+                'ingredients': [
+                    {'id': self.fixtures.ingredients[0], 'amount': 25},
+                    {'id': Ingredient.objects.create(
+                        name='новый ингредиент', measurement_unit='г'
+                    ).id, 'amount': 5}
+                ],
+                'tags': self.fixtures.tags,
+                'image': get_image(),
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 10
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_aggregate_actual()
+
+    def test_recipe_and_author_delete(self):
+        self.recipe.delete()
+        self.assert_aggregate_actual()
+        User.objects.filter(id__in=self.fixtures.authors[1:]).delete()
+        self.assert_aggregate_actual()
+
+    def test_cart_rows_changed(self):
+        ShoppingCart.objects.filter(recipe=self.recipe).delete()
+        self.assert_aggregate_actual()
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        self.assert_aggregate_actual()
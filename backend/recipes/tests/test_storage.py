@@ -0,0 +1,23 @@
+import os
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from recipes.storage import ContentAddressedStorage
+from .fixtures import TemporaryFilesMixin
+
+
+class ContentAddressedStorageTests(TemporaryFilesMixin, SimpleTestCase):
+    """Повторная загрузка файла переживает его удаление очисткой."""
+
+    def test_file_removed_after_exists(self):
+        storage = ContentAddressedStorage()
+        name = storage.save('images/test.png', ContentFile(b'image'))
+        os.remove(storage.path(name))
+        # Файл удален между проверкой exists() и обновлением времени.
+        with mock.patch.object(storage, 'exists', side_effect=[True, False]):
+            self.assertEqual(
+                storage.save('images/test.png', ContentFile(b'image')), name
+            )
+        self.assertTrue(os.path.exists(storage.path(name)))
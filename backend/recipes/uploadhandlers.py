@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework.exceptions import ValidationError
+
+from .constants import RECIPE_IMAGE_MAX_SIZE
+from .images import IMAGE_TOO_LARGE_ERROR
+
+
+class RecipeImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Записывает загружаемое изображение рецепта сразу во временный файл,
+    не держа его в памяти, и прерывает загрузку, как только файл или весь
+    запрос превышают допустимый размер.
+    """
+
+    def handle_raw_input(self, input_data, meta, content_length, boundary,
+                         encoding=None):
+        if content_length and content_length > (
+            RECIPE_IMAGE_MAX_SIZE + settings.DATA_UPLOAD_MAX_MEMORY_SIZE
+        ):
+            raise ValidationError({'image': [IMAGE_TOO_LARGE_ERROR]})
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > RECIPE_IMAGE_MAX_SIZE:
+            raise ValidationError({'image': [IMAGE_TOO_LARGE_ERROR]})
+        return super().receive_data_chunk(raw_data, start)
@@ -1,53 +1,112 @@
-from django.db.models import Exists, F, OuterRef, Sum
-from django.http import FileResponse
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch
+from django.http import StreamingHttpResponse
+from django.utils.http import content_disposition_header
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters, status, viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import JSONParser, MultiPartParser
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .filters import IngredientFilter, RecipeFilter
+from users.models import Subscribe, User
+from .constants import SHOPPING_LIST_CHUNK_SIZE
+from .data_versions import INGREDIENTS_DATA, TAGS_DATA
+from .filters import IngredientFilter, RecipeFilter, RecipeSearchFilter
+from .images import CARD_RENDITION, DETAIL_RENDITION
+from .ingredient_index import search_ingredients
+from .mixins import (PrerenderedListMixin, SerializationTimingMixin,
+                     VaryOnAcceptMixin)
 from .models import (Favorites, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
-from .pagination import RecipesUsersPagination
+                     ShoppingCart, ShoppingCartIngredient, Tag)
+from .pagination import CursorPaginationMixin, RecipesUsersPagination
 from .permissions import IsAuthorOnly
-from .serializers import (FavoritesSerializer, IngredientSerializer,
-                          RecipeCreateUpdateSerializer, RecipeSerializer,
-                          ShoppingCartSerializer, TagSerializer)
+from .renderers import (ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                        ShoppingListTextRenderer)
+from .serializers import (IngredientSerializer, RecipeCreateUpdateSerializer,
+                          RecipeIdsSerializer, RecipeSerializer,
+                          ShoppingCartSerializer, ShortRecipeSerializer,
+                          TagSerializer)
+from .uploadhandlers import RecipeImageUploadHandler
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(PrerenderedListMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюест для ингредиентов."""
 
+    data_name = INGREDIENTS_DATA
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
 
+    def list(self, request, *args, **kwargs):
+        """
+        Поиск по названию обслуживается общим для воркеров индексом в
+        памяти: сначала ингредиенты, начинающиеся с запроса, затем
+        содержащие его.
+        """
+
+        name = request.query_params.get('name')
+        if name:
+            return Response(search_ingredients(name))
+        return super().list(request, *args, **kwargs)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(VaryOnAcceptMixin, SerializationTimingMixin,
+                    CursorPaginationMixin, viewsets.ModelViewSet):
     """Вьюсет для работы с рецептами."""
 
+    BULK_ADD_STATUSES = {True: 'added', False: 'already_in_list'}
+    BULK_NOT_FOUND = 'not_found'
+    BULK_REMOVE_STATUSES = {True: 'removed', False: 'not_in_list'}
+    ALREADY_IN_LIST_MESSAGE = {'detail': 'Рецепт уже находится в списке'}
     RECIPE_DELETE_MESSAGE = {'detail': 'Рецепт удален из списка'}
+    RECIPE_NOT_FOUND_MESSAGE = {'detail': 'Рецепт не существует'}
     NOT_IN_LIST_MESSAGE = {'detail': 'Рецепт не находится в списке'}
 
-    filter_backends = (DjangoFilterBackend, filters.SearchFilter)
+    filter_backends = (DjangoFilterBackend, RecipeSearchFilter)
     filterset_class = RecipeFilter
     pagination_class = RecipesUsersPagination
+    parser_classes = (JSONParser, MultiPartParser)
     permission_classes = (IsAuthorOnly,)
     serializer_class = RecipeSerializer
 
+    def initialize_request(self, request, *args, **kwargs):
+        """
+        Изображение из multipart-запроса пишется во временный файл с
+        проверкой размера по мере загрузки.
+        """
+
+        request.upload_handlers = [RecipeImageUploadHandler(request)]
+        return super().initialize_request(request, *args, **kwargs)
+
     def get_queryset(self):
 
-        queryset = Recipe.objects.select_related('author').prefetch_related(
+        queryset = Recipe.objects.prefetch_related(
             'tags',
-            'ingredients'
+            Prefetch(
+                'ingredients_used',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
         )
 
         if not self.request.user.is_authenticated:
-            return queryset.all()
+            return queryset.select_related('author')
         return (
-            queryset.annotate(
+            queryset.prefetch_related(
+                Prefetch(
+                    'author',
+                    queryset=User.objects.annotate(
+                        is_subscribed=Exists(
+                            Subscribe.objects.filter(
+                                author=OuterRef('id'),
+                                subscriber=self.request.user
+                            )
+                        )
+                    )
+                )
+            ).annotate(
                 is_favorited=Exists(
                     Favorites.objects.filter(
                         recipe=OuterRef('id'),
@@ -63,6 +122,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ).all()
         )
 
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['image_rendition'] = (
+            CARD_RENDITION if self.action == 'list' else DETAIL_RENDITION
+        )
+        return context
+
     def get_serializer_class(self):
         """Возвращает необходимый сериализатор."""
 
@@ -71,16 +137,30 @@ class RecipeViewSet(viewsets.ModelViewSet):
         return RecipeCreateUpdateSerializer
 
     @staticmethod
-    def create_fav_shop(serializer, request, pk):
+    def get_recipe_id(pk):
+        try:
+            return int(pk)
+        except ValueError:
+            raise ValidationError(RecipeViewSet.RECIPE_NOT_FOUND_MESSAGE)
+
+    @staticmethod
+    def create_fav_shop(model, request, pk):
         """
         Статистический метод для записи в модели избранного и списка покупок.
         """
 
-        data_dict = {'user': request.user.id, 'recipe': pk}
-        serializer = serializer(data=data_dict, context={'request': request})
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+        recipe_id = RecipeViewSet.get_recipe_id(pk)
+        if not model.objects.add_recipes(request.user, [recipe_id]):
+            if Recipe.objects.filter(pk=recipe_id).exists():
+                raise ValidationError(RecipeViewSet.ALREADY_IN_LIST_MESSAGE)
+            raise ValidationError(RecipeViewSet.RECIPE_NOT_FOUND_MESSAGE)
+        return Response(
+            ShortRecipeSerializer(
+                Recipe.objects.get(pk=recipe_id),
+                context={'request': request}
+            ).data,
+            status=status.HTTP_201_CREATED
+        )
 
     @staticmethod
     def delete_fav_shop(model, request, pk):
@@ -89,9 +169,8 @@ class RecipeViewSet(viewsets.ModelViewSet):
         покупок.
         """
 
-        queryset = model.objects.filter(recipe=pk, user=request.user)
-        if queryset.exists():
-            queryset.delete()
+        recipe_id = RecipeViewSet.get_recipe_id(pk)
+        if model.objects.remove_recipes(request.user, [recipe_id]):
             return Response(
                 RecipeViewSet.RECIPE_DELETE_MESSAGE,
                 status=status.HTTP_204_NO_CONTENT
@@ -101,49 +180,113 @@ class RecipeViewSet(viewsets.ModelViewSet):
             status=status.HTTP_404_NOT_FOUND
         )
 
+    @staticmethod
+    def bulk_fav_shop(model, request):
+        """
+        Статический метод для массового добавления (POST) и удаления (DELETE)
+        рецептов в избранном и списке покупок одной транзакцией.
+        """
+
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+
+        with transaction.atomic():
+            existing = set(
+                Recipe.objects.filter(
+                    id__in=recipe_ids
+                ).values_list('id', flat=True)
+            )
+            if request.method == 'POST':
+                changed = model.objects.add_recipes(
+                    request.user, [pk for pk in recipe_ids if pk in existing]
+                )
+                statuses = RecipeViewSet.BULK_ADD_STATUSES
+            else:
+                changed = model.objects.remove_recipes(
+                    request.user, recipe_ids
+                )
+                statuses = RecipeViewSet.BULK_REMOVE_STATUSES
+
+        changed = set(changed)
+        return Response(
+            [
+                {
+                    'id': pk,
+                    'status': (
+                        RecipeViewSet.BULK_NOT_FOUND if pk not in existing
+                        else statuses[pk in changed]
+                    )
+                }
+                for pk in recipe_ids
+            ],
+            status=status.HTTP_200_OK
+        )
+
     @action(detail=False, methods=['get'],
+            permission_classes=[IsAuthenticated],
+            renderer_classes=[ShoppingListTextRenderer,
+                              ShoppingListCSVRenderer,
+                              ShoppingListJSONRenderer],
             serializer_class=ShoppingCartSerializer)
     def download_shopping_cart(self, request):
+        """
+        Отдает список покупок потоком в формате, выбранном параметром
+        ?format=txt|csv|json (по умолчанию txt).
+        """
 
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__shoppingcart__user=request.user
+        ingredients = ShoppingCartIngredient.objects.filter(
+            user=request.user
         ).values(
             name=F('ingredient__name'),
-            unit=F('ingredient__measurement_unit')
-        ).order_by('name').annotate(total=Sum('amount'))
+            unit=F('ingredient__measurement_unit'),
+            total=F('amount')
+        ).order_by('name').iterator(chunk_size=SHOPPING_LIST_CHUNK_SIZE)
 
-        shopping_list = '\n'.join(
-            [f"{ingredient['name']} {ingredient['total']} {ingredient['unit']}"
-             for ingredient in ingredients]
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients),
+            content_type=f'{renderer.media_type}; charset=utf-8'
         )
-
-        response = FileResponse(shopping_list, content_type='text/plain')
-        response['Content-Disposition'] = (
-            'attachment; filename="Список покупок.txt"'
+        response['Content-Disposition'] = content_disposition_header(
+            True, f'Список покупок.{renderer.format}'
         )
         return response
 
     @action(detail=True, methods=['post', 'patch'],
             permission_classes=[IsAuthenticated])
     def favorite(self, request, pk):
-        return self.create_fav_shop(FavoritesSerializer, request, pk)
+        return self.create_fav_shop(Favorites, request, pk)
 
     @favorite.mapping.delete
     def delete_favorite(self, request, pk):
         return self.delete_fav_shop(model=Favorites, request=request, pk=pk)
 
+    @action(detail=False, methods=['post', 'delete'],
+            permission_classes=[IsAuthenticated],
+            url_name='favorite-bulk', url_path='favorite')
+    def favorite_bulk(self, request):
+        return self.bulk_fav_shop(Favorites, request)
+
     @action(detail=True, methods=['post', 'putch'],
             permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk):
-        return self.create_fav_shop(ShoppingCartSerializer, request, pk)
+        return self.create_fav_shop(ShoppingCart, request, pk)
 
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk):
         return self.delete_fav_shop(ShoppingCart, request, pk)
 
+    @action(detail=False, methods=['post', 'delete'],
+            permission_classes=[IsAuthenticated],
+            url_name='shopping-cart-bulk', url_path='shopping_cart')
+    def shopping_cart_bulk(self, request):
+        return self.bulk_fav_shop(ShoppingCart, request)
+
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(PrerenderedListMixin, viewsets.ReadOnlyModelViewSet):
     """Вьюсет для тегов."""
 
+    data_name = TAGS_DATA
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 
+from recipes.admin_filters import input_filter
 from .models import Subscribe, User
 
 
@@ -8,26 +9,26 @@ from .models import Subscribe, User
 class UserAdmin(UserAdmin):
     list_display = (
         'username', 'first_name', 'last_name', 'email',
-        'recipe_count', 'subscribe_count'
+        'recipes_count', 'followers_count'
     )
     list_display_links = ('username', 'first_name', 'last_name', 'email')
-    list_filter = ('first_name', 'last_name',)
+    list_filter = (
+        input_filter('first_name', 'имени'),
+        input_filter('last_name', 'фамилии')
+    )
     search_fields = ('username', 'first_name', 'last_name',)
     empty_value_display = 'пусто'
 
-    def recipe_count(self, obj):
-        return obj.recipes.count()
-    recipe_count.short_description = 'Количество рецептов'
-
-    def subscribe_count(self, obj):
-        return Subscribe.objects.filter(author=obj).count()
-    subscribe_count.short_description = 'Количество подписчиков'
-
 
 @admin.register(Subscribe)
 class RecipetAdmin(admin.ModelAdmin):
     list_display = ('author', 'subscriber')
     list_display_links = ('author', 'subscriber')
-    list_filter = ('author', 'subscriber')
-    search_fields = ('author', 'subscriber')
+    list_filter = (
+        input_filter('author__username', 'автору'),
+        input_filter('subscriber__username', 'подписчику')
+    )
+    list_select_related = ('author', 'subscriber')
+    search_fields = ('author__username', 'subscriber__username')
+    autocomplete_fields = ('author', 'subscriber')
     empty_value_display = 'пусто'
@@ -1,10 +1,74 @@
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
-from django.db import models
+from django.db import connections, models, transaction
+from django.db.models.functions import Greatest
 
 from .constants import EMAIL_MAX_LENGTH, USER_MAX_LENGTH
 
 
+def update_counter(queryset, field, delta):
+    """
+    Атомарно изменяет счетчик на delta одним UPDATE, не опуская его ниже
+    нуля.
+    """
+
+    return queryset.update(
+        **{field: Greatest(models.F(field) + delta, 0)}
+    )
+
+
+class SubscribeManager(models.Manager):
+    """Менеджер подписок."""
+
+    def subscribe(self, subscriber, author_id):
+        """
+        Подписывает пользователя на автора одним запросом
+        (INSERT ... ON CONFLICT DO NOTHING). Возвращает False, если автор не
+        существует, совпадает с подписчиком или подписка уже есть.
+        """
+
+        connection = connections[self.db]
+        quote = connection.ops.quote_name
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {quote(self.model._meta.db_table)} '
+                '(author_id, subscriber_id) '
+                f'SELECT id, %s FROM {quote(User._meta.db_table)} '
+                'WHERE id = %s AND id <> %s '
+                'ON CONFLICT (author_id, subscriber_id) DO NOTHING '
+                'RETURNING id',
+                [subscriber.id, author_id, subscriber.id]
+            )
+            if cursor.fetchone() is None:
+                return False
+            update_counter(
+                User.objects.filter(id=author_id), 'followers_count', 1
+            )
+        return True
+
+    def unsubscribe(self, subscriber, author_id):
+        """
+        Удаляет подписку одним запросом (DELETE ... RETURNING) и возвращает
+        True, если она существовала. Запрос не отправляет сигналов удаления,
+        поэтому счетчик подписчиков уменьшается здесь.
+        """
+
+        connection = connections[self.db]
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'DELETE FROM '
+                f'{connection.ops.quote_name(self.model._meta.db_table)} '
+                'WHERE author_id = %s AND subscriber_id = %s RETURNING id',
+                [author_id, subscriber.id]
+            )
+            if cursor.fetchone() is None:
+                return False
+            update_counter(
+                User.objects.filter(id=author_id), 'followers_count', -1
+            )
+        return True
+
+
 class Subscribe(models.Model):
     """Модель подписок."""
 
@@ -23,6 +87,8 @@ class Subscribe(models.Model):
         verbose_name='Подписчик'
     )
 
+    objects = SubscribeManager()
+
     class Meta:
         constraints = [
             models.CheckConstraint(
@@ -72,6 +138,16 @@ class User(AbstractUser):
         unique=True,
         verbose_name='Электронная почта'
     )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('first_name', 'last_name', 'username')
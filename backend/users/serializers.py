@@ -1,6 +1,7 @@
-from django.core.exceptions import ValidationError
 from rest_framework import serializers
 
+from recipes.fields import RecipeImageField
+from recipes.images import THUMB_RENDITION
 from recipes.models import Recipe
 from .models import Subscribe, User
 
@@ -13,23 +14,39 @@ class UserSerializer(serializers.ModelSerializer):
     class Meta:
         fields = (
             'id', 'username', 'first_name', 'last_name', 'email',
-            'is_subscribed'
+            'is_subscribed', 'recipes_count', 'followers_count'
         )
         model = User
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
-        return (request
-                and request.user.is_authenticated
-                and obj.author.filter(
+        if not request or not request.user.is_authenticated:
+            return False
+        return obj.id in self.get_subscribed_ids(request)
+
+    @staticmethod
+    def get_subscribed_ids(request):
+        """
+        Возвращает id авторов, на которых подписан пользователь. Загружается
+        одним запросом и кэшируется на объекте запроса, поэтому все
+        сериализаторы ответа используют один и тот же набор.
+        """
+
+        if not hasattr(request, '_subscribed_ids'):
+            request._subscribed_ids = set(
+                Subscribe.objects.filter(
                     subscriber=request.user
-                ).exists())
+                ).values_list('author_id', flat=True)
+            )
+        return request._subscribed_ids
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
     """Короткий сериализатор рецептов для подписок."""
 
-    image = serializers.ImageField(read_only=True)
+    image = RecipeImageField(rendition=THUMB_RENDITION)
 
     class Meta:
         fields = ('id', 'name', 'image', 'cooking_time')
@@ -40,59 +57,33 @@ class SubscribeSerializer(UserSerializer):
     """Сериализатор подписок для GET запросов."""
 
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.ReadOnlyField(source='recipes.count')
 
     class Meta:
-        fields = UserSerializer.Meta.fields + ('recipes', 'recipes_count')
+        fields = UserSerializer.Meta.fields + ('recipes',)
         model = User
 
+    @staticmethod
+    def get_recipes_limit(request):
+        """Возвращает ограничение количества рецептов из параметра limit."""
+
+        try:
+            recipes_limit = int(request.query_params.get('limit'))
+        except (TypeError, ValueError):
+            return None
+        return recipes_limit if recipes_limit >= 0 else None
+
     def get_recipes(self, instance):
-        recipes = instance.recipes.all()
         request = self.context.get('request')
 
         if not request:
             return []
 
-        recipes_limit = request.query_params.get('limit')
-        if recipes_limit:
-            try:
-                recipes = recipes[:int(recipes_limit)]
-            except ValueError:
-                pass
+        if hasattr(instance, 'recipes_preview'):
+            recipes = instance.recipes_preview
+        else:
+            recipes = instance.recipes.all()[:self.get_recipes_limit(request)]
 
         return ShortRecipeSerializer(
             recipes, context=self.context,
             many=True
         ).data
-
-
-class SubscribeCreateDeleteSerializer(serializers.ModelSerializer):
-    """Сериализатор для создания и удаления подписок."""
-
-    SELF_SUBSCRIPTION_ERROR = {
-        'detail': 'Невозвожно подписаться на самого себя'
-    }
-    SUBSCRIPTION_ALREADY_EXISTS = {
-        'detail': 'Вы уже подписаны на этого пользователя'
-    }
-
-    class Meta:
-        fields = ('author', 'subscriber')
-        model = Subscribe
-
-    def validate(self, data):
-        author = data.get('author')
-        subscriber = self.context['request'].user
-        if author == subscriber:
-            raise ValidationError(self.SELF_SUBSCRIPTION_ERROR)
-        if Subscribe.objects.filter(
-            author=author, subscriber=subscriber
-        ).exists():
-            raise ValidationError(self.SUBSCRIPTION_ALREADY_EXISTS)
-        return data
-
-    def to_representation(self, instance):
-        return SubscribeSerializer(
-            instance.author,
-            context=self.context
-        ).data
@@ -0,0 +1,54 @@
+from django.db.models.signals import post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from recipes.signals import get_origin_model
+from .models import Subscribe, User, update_counter
+
+
+def change_followers(author_id, delta):
+    update_counter(User.objects.filter(id=author_id), 'followers_count', delta)
+
+
+@receiver(pre_save, sender=Subscribe)
+def subscribe_changing(instance, **kwargs):
+    instance._previous = Subscribe.objects.filter(
+        pk=instance.pk
+    ).values_list('author_id', flat=True).first() if instance.pk else None
+
+
+@receiver(post_save, sender=Subscribe)
+def subscribe_changed(instance, **kwargs):
+    """
+    Обновляет счетчики подписчиков для подписок, созданных или измененных
+    через ORM (например, в админке). API пишет в таблицу запросами
+    SubscribeManager без сигналов и обновляет счетчик сам.
+    """
+
+    if instance._previous == instance.author_id:
+        return
+    if instance._previous:
+        change_followers(instance._previous, -1)
+    change_followers(instance.author_id, 1)
+
+
+@receiver(pre_delete, sender=Subscribe)
+def subscribe_deleted(instance, origin, **kwargs):
+    """
+    Уменьшает счетчик подписчиков автора при удалении подписки. При
+    удалении пользователя счетчики обновляет user_deleted.
+    """
+
+    if get_origin_model(origin) is Subscribe:
+        change_followers(instance.author_id, -1)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleted(instance, **kwargs):
+    """
+    Уменьшает счетчики подписчиков у авторов, на которых подписан
+    удаляемый пользователь: его подписки удаляются каскадом.
+    """
+
+    update_counter(
+        User.objects.filter(author__subscriber=instance), 'followers_count', -1
+    )
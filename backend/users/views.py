@@ -1,28 +1,53 @@
+from django.db.models import Exists, OuterRef, Prefetch, Value
 from djoser.views import UserViewSet as DjoserViewSet
 from rest_framework import status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
-from recipes.pagination import RecipesUsersPagination
+from recipes.mixins import SerializationTimingMixin, VaryOnAcceptMixin
+from recipes.models import Recipe
+from recipes.pagination import CursorPaginationMixin, RecipesUsersPagination
 from .models import Subscribe, User
-from .serializers import (SubscribeCreateDeleteSerializer, SubscribeSerializer,
-                          UserSerializer)
+from .serializers import SubscribeSerializer, UserSerializer
 
 
-class UserViewSet(DjoserViewSet):
+class UserViewSet(VaryOnAcceptMixin, SerializationTimingMixin,
+                  CursorPaginationMixin, DjoserViewSet):
     """
     Вьюсет для регистрации, смены пароля, получения списков пользователей и
     подписок, создания/удаления подписки.
     """
 
+    SELF_SUBSCRIPTION_ERROR = {
+        'detail': 'Невозвожно подписаться на самого себя'
+    }
+    SUBSCRIPTION_ALREADY_EXISTS = {
+        'detail': 'Вы уже подписаны на этого пользователя'
+    }
     UNSUBSCRIBED = {'detail': 'Вы отписались от пользователя'}
+    USER_NOT_FOUND_ERROR = {'detail': 'Пользователь не существует'}
     UNSUBSCRIBED_ERROR = {'detail': 'Вы не подписаны на этого пользователя'}
 
+    cursor_ordering = ('username', 'id')
     pagination_class = RecipesUsersPagination
     queryset = User.objects.all()
     serializer_class = UserSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.request.user.is_authenticated:
+            return queryset
+        return queryset.annotate(
+            is_subscribed=Exists(
+                Subscribe.objects.filter(
+                    author=OuterRef('id'),
+                    subscriber=self.request.user
+                )
+            )
+        )
+
     def get_permissions(self):
         if self.action == 'me':
             return (IsAuthenticated(),)
@@ -31,37 +56,60 @@ class UserViewSet(DjoserViewSet):
         return super().get_permissions()
 
     @action(detail=False, methods=['get'],
-            permission_classes=[IsAuthenticated])
+            permission_classes=[IsAuthenticated],
+            serializer_class=SubscribeSerializer)
     def subscriptions(self, request):
 
-        queryset = User.objects.filter(author__subscriber=request.user)
+        queryset = User.objects.filter(
+            author__subscriber=request.user
+        ).annotate(
+            is_subscribed=Value(True)
+        ).order_by('username').prefetch_related(
+            Prefetch(
+                'recipes',
+                queryset=Recipe.objects.order_by('-pub_date', '-id')[
+                    :SubscribeSerializer.get_recipes_limit(request)
+                ],
+                to_attr='recipes_preview'
+            )
+        )
         paginate_queryset = self.paginate_queryset(queryset)
 
-        serializer = SubscribeSerializer(
-            paginate_queryset,
-            context={'request': request},
-            many=True
+        serializer = self.get_serializer(paginate_queryset, many=True)
+        return self.get_paginated_response(
+            self.get_serializer_data(serializer)
         )
-        return self.get_paginated_response(serializer.data)
+
+    def get_author_id(self, id):
+        try:
+            return int(id)
+        except ValueError:
+            raise ValidationError(self.USER_NOT_FOUND_ERROR)
 
     @action(detail=True, methods=['post'],
             permission_classes=[IsAuthenticated],
-            serializer_class=SubscribeCreateDeleteSerializer)
+            serializer_class=SubscribeSerializer)
     def subscribe(self, request, id):
-        data_dict = {'author': id, 'subscriber': request.user.id}
-        serializer = SubscribeCreateDeleteSerializer(
-            data=data_dict,
-            context={'request': request}
+        author_id = self.get_author_id(id)
+        if author_id == request.user.id:
+            raise ValidationError(self.SELF_SUBSCRIPTION_ERROR)
+        if not Subscribe.objects.subscribe(request.user, author_id):
+            if User.objects.filter(pk=author_id).exists():
+                raise ValidationError(self.SUBSCRIPTION_ALREADY_EXISTS)
+            raise ValidationError(self.USER_NOT_FOUND_ERROR)
+        serializer = self.get_serializer(
+            User.objects.annotate(is_subscribed=Value(True)).get(pk=author_id)
+        )
+        return Response(
+            self.get_serializer_data(serializer),
+            status=status.HTTP_201_CREATED
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @subscribe.mapping.delete
     def delete_subscribe(self, request, id):
-        queryset = Subscribe.objects.filter(author=id, subscriber=request.user)
-        if queryset.exists():
-            queryset.delete()
+        if Subscribe.objects.unsubscribe(
+            request.user, self.get_author_id(id)
+        ):
             return Response(
                 self.UNSUBSCRIBED, status=status.HTTP_204_NO_CONTENT
             )